@@ -0,0 +1,70 @@
+"""Micro-benchmark for the AES frame codec.
+
+Compares the per-call functions (key material and cipher rebuilt on every
+frame) with the reusable AesCodec, single and batched.
+
+Run from the repository root inside a Home Assistant development
+environment:
+
+    python benchmarks/crypto_benchmark.py
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from custom_components.airibes.const import AES_IV_HEX, AES_KEY_HEX  # noqa: E402
+from custom_components.airibes.crypto_utils import (  # noqa: E402
+    AesCodec,
+    decrypt_aes_cbc,
+    encrypt_aes_cbc,
+)
+
+NUMBER = 20000
+BATCH = 100
+
+PAYLOAD = json.dumps({
+    "params": [{
+        "76": json.dumps([
+            {"id": target_id, "x": 1.25 + target_id, "y": 3.5 - target_id}
+            for target_id in range(3)
+        ])
+    }]
+})
+
+
+def legacy_encrypt():
+    encrypt_aes_cbc(bytes.fromhex(AES_KEY_HEX), bytes.fromhex(AES_IV_HEX), PAYLOAD)
+
+
+def legacy_decrypt(ciphertext):
+    decrypt_aes_cbc(bytes.fromhex(AES_KEY_HEX), bytes.fromhex(AES_IV_HEX), ciphertext)
+
+
+def report(name, seconds, frames):
+    print(f"{name:<24} {seconds * 1e6 / frames:8.2f} us/frame")
+
+
+def main():
+    codec = AesCodec(bytes.fromhex(AES_KEY_HEX), bytes.fromhex(AES_IV_HEX))
+    ciphertext = codec.encrypt(PAYLOAD)
+    assert codec.decrypt(ciphertext) == PAYLOAD
+    assert decrypt_aes_cbc(bytes.fromhex(AES_KEY_HEX), bytes.fromhex(AES_IV_HEX), ciphertext) == PAYLOAD
+
+    plaintexts = [PAYLOAD] * BATCH
+    ciphertexts = [ciphertext] * BATCH
+    batches = NUMBER // BATCH
+
+    print(f"payload: {len(PAYLOAD)} bytes, {NUMBER} frames")
+    report("legacy encrypt", timeit.timeit(legacy_encrypt, number=NUMBER), NUMBER)
+    report("codec encrypt", timeit.timeit(lambda: codec.encrypt(PAYLOAD), number=NUMBER), NUMBER)
+    report(f"codec encrypt x{BATCH}", timeit.timeit(lambda: codec.encrypt_batch(plaintexts), number=batches), NUMBER)
+    report("legacy decrypt", timeit.timeit(lambda: legacy_decrypt(ciphertext), number=NUMBER), NUMBER)
+    report("codec decrypt", timeit.timeit(lambda: codec.decrypt(ciphertext), number=NUMBER), NUMBER)
+    report(f"codec decrypt x{BATCH}", timeit.timeit(lambda: codec.decrypt_batch(ciphertexts), number=batches), NUMBER)
+
+
+if __name__ == "__main__":
+    main()
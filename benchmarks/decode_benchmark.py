@@ -0,0 +1,74 @@
+"""Micro-benchmark for the inbound position frame decode path.
+
+Compares the previous decode path (bytes -> str -> json.loads, per-call
+key setup and decrypt, json.loads, unescape, json.loads) with the
+serializer path that decrypts with the shared codec and parses straight
+from bytes. The serializer uses orjson when it is installed.
+
+Run from the repository root inside a Home Assistant development
+environment:
+
+    python benchmarks/decode_benchmark.py
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from custom_components.airibes import serializer  # noqa: E402
+from custom_components.airibes.const import AES_IV_HEX, AES_KEY_HEX  # noqa: E402
+from custom_components.airibes.crypto_utils import codec, decrypt_aes_cbc  # noqa: E402
+
+NUMBER = 20000
+
+
+def build_frame(targets: int) -> bytes:
+    """构建一个包含 key 76 人员位置的上行帧."""
+    positions = json.dumps([
+        {"id": target_id, "x": 1.25 + target_id, "y": 3.5 - target_id}
+        for target_id in range(targets)
+    ])
+    data = codec.encrypt(json.dumps({"params": [{"76": positions}]}))
+    return json.dumps({
+        "cmd": 2006,
+        "dir": "10",
+        "msgId": 1,
+        "prio": 2,
+        "ver": "2.3",
+        "timestamp": 1700000000000,
+        "data": data,
+    }).encode()
+
+
+def legacy_decode(payload: bytes):
+    # 原来的 decrypt_data: 每帧重新转换密钥并创建 Cipher
+    payload_data = json.loads(payload.decode('utf-8'))
+    plaintext = decrypt_aes_cbc(bytes.fromhex(AES_KEY_HEX), bytes.fromhex(AES_IV_HEX), payload_data['data'])
+    params = json.loads(plaintext)['params']
+    value = params[0]['76'].replace('\\"', '"')
+    return json.loads(value)
+
+
+def serializer_decode(payload: bytes):
+    payload_data = serializer.loads(payload)
+    params = serializer.loads(codec.decrypt_bytes(payload_data['data']))['params']
+    return serializer.loads_embedded(params[0]['76'])
+
+
+def main():
+    print(f"serializer backend: {'orjson' if serializer.orjson else 'json'}, {NUMBER} frames")
+    for targets in (1, 5, 20):
+        payload = build_frame(targets)
+        assert legacy_decode(payload) == serializer_decode(payload)
+        legacy = timeit.timeit(lambda: legacy_decode(payload), number=NUMBER)
+        fast = timeit.timeit(lambda: serializer_decode(payload), number=NUMBER)
+        print(
+            f"{targets:>3} targets: legacy {legacy * 1e6 / NUMBER:7.2f} us/frame, "
+            f"serializer {fast * 1e6 / NUMBER:7.2f} us/frame"
+        )
+
+
+if __name__ == "__main__":
+    main()
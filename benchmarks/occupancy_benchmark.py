@@ -0,0 +1,76 @@
+"""Micro-benchmark for point-in-region classification.
+
+Counts targets per region for 1/10/100 targets against 10/100/1000
+rectangles using a naive per-target loop, the uniform grid fallback and the
+vectorized NumPy classifier (when NumPy is installed). The crossover between
+the last two is what OCCUPANCY_NUMPY_MIN_BATCH is tuned from.
+
+Run from the repository root inside a Home Assistant development
+environment:
+
+    python benchmarks/occupancy_benchmark.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from custom_components.airibes.occupancy import RegionClassifier, np  # noqa: E402
+
+APARTMENT_SIZE = 20000  # 毫米
+CELL_SIZE = 1000
+NUMBER = 200
+
+
+def build_regions(count: int) -> list:
+    """随机生成矩形区域."""
+    regions = []
+    for index in range(count):
+        x = random.uniform(0, APARTMENT_SIZE)
+        y = random.uniform(0, APARTMENT_SIZE)
+        regions.append((("area", str(index)), (x, y, x + random.uniform(300, 3000), y + random.uniform(300, 3000))))
+    return regions
+
+
+def naive_count(regions: list, points: list) -> dict:
+    """逐个目标遍历所有矩形."""
+    counts = {}
+    for x, y in points:
+        for key, (x0, y0, x1, y1) in regions:
+            if x0 <= x <= x1 and y0 <= y <= y1:
+                counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def main():
+    random.seed(0)
+    print(f"numpy: {'available' if np is not None else 'not installed'}, {NUMBER} ticks per case")
+    print(f"{'targets':>7} {'regions':>7} {'naive':>10} {'grid':>10} {'numpy':>10}  (us/tick)")
+    for region_count in (10, 100, 1000):
+        regions = build_regions(region_count)
+        grid = RegionClassifier(regions, CELL_SIZE, use_numpy=False)
+        vectorized = RegionClassifier(regions, CELL_SIZE, min_batch=0) if np is not None else None
+        for target_count in (1, 10, 100):
+            points = [
+                (random.uniform(0, APARTMENT_SIZE), random.uniform(0, APARTMENT_SIZE))
+                for _ in range(target_count)
+            ]
+            expected = naive_count(regions, points)
+            assert grid.count(points) == expected
+
+            naive = timeit.timeit(lambda: naive_count(regions, points), number=NUMBER)
+            gridded = timeit.timeit(lambda: grid.count(points), number=NUMBER)
+            row = f"{target_count:>7} {region_count:>7} {naive * 1e6 / NUMBER:>10.1f} {gridded * 1e6 / NUMBER:>10.1f}"
+            if vectorized is not None:
+                assert vectorized.count(points) == expected
+                numpy_time = timeit.timeit(lambda: vectorized.count(points), number=NUMBER)
+                row += f" {numpy_time * 1e6 / NUMBER:>10.1f}"
+            else:
+                row += f" {'-':>10}"
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
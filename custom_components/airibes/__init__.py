@@ -61,9 +61,13 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     if unload_ok and DOMAIN in hass.data:
         panel_manager = hass.data[DOMAIN].get("panel_manager")
         storage_manager = hass.data[DOMAIN].get("storage_manager")
+        mqtt_client = hass.data[DOMAIN].get("mqtt_client")
         
         if panel_manager:
             await panel_manager.async_unload()
+
+        if mqtt_client:
+            await mqtt_client.async_stop()
         
         # 清理存储的数据（如果用户确认）
         if storage_manager and entry.data.get("clear_data_on_unload", False):
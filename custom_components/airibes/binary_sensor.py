@@ -110,7 +110,8 @@ class RoomBinarySensor(BinarySensorEntity):
         self._room_id = str(room_id)
         self._name = name
         self._apartment_id = apartment_id
-        self._state = False
+        self._state = False  # 雷达上报的状态（key 19）
+        self._person_count = 0  # 根据人员位置计算的人数
         self._attr_unique_id = f"occupancy_apartment_{apartment_id}_room_{room_id}"
         self._attr_device_class = "occupancy"
         self._attr_available = True
@@ -137,36 +138,49 @@ class RoomBinarySensor(BinarySensorEntity):
         _LOGGER.info("删除房间实体: %s", sensor_key)
 
     def set_state(self, state: bool) -> None:
-        """设置房间状态."""
+        """设置雷达上报的房间状态."""
         self._state = state
+        self._publish_state()
+
+    def set_person_count(self, count: int) -> None:
+        """设置根据人员位置计算的房间人数，与雷达上报的状态取或."""
+        if count == self._person_count:
+            return
+        self._person_count = count
+        self._publish_state()
+
+    def _publish_state(self) -> None:
+        """写入合并后的状态."""
         # 如果实体已经添加到 HA，则触发状态更新
         if self.hass and self.entity_id:
             self.hass.states.async_set(
                 self.entity_id,
-                STATE_ON if state else STATE_OFF,
+                self.state,
                 {
                     "friendly_name": self._name,
                     "device_class": "occupancy",
                     "icon": "mdi:home-account",
+                    "person_count": self._person_count,
                 }
             )
-            _LOGGER.info(f"房间状态已更新: {self.entity_id} -> {STATE_ON if state else STATE_OFF}")
+            _LOGGER.info(f"房间状态已更新: {self.entity_id} -> {self.state}")
 
     @property
     def state(self) -> str:
         """Return the state of the binary sensor."""
-        return STATE_ON if self._state else STATE_OFF
+        return STATE_ON if self.is_on else STATE_OFF
 
     @property
     def is_on(self) -> bool:
         """Return true if the binary sensor is on."""
-        return self._state
+        return self._state or self._person_count > 0
 
     @property
     def extra_state_attributes(self) -> dict:
         """Return the state attributes."""
         return {
-            "room_id": self._room_id
+            "room_id": self._room_id,
+            "person_count": self._person_count
         }
 
     @property
@@ -191,7 +205,8 @@ class AreaBinarySensor(BinarySensorEntity):
         self._area_id = str(area_id)
         self._name = name
         self._apartment_id = apartment_id
-        self._state = False
+        self._state = False  # 雷达上报的状态（key 17）
+        self._person_count = 0  # 根据人员位置计算的人数
         self._event_count = 0
         self._last_event_time = None
         self._attr_unique_id = f"occupancy_apartment_{apartment_id}_area_{area_id}"
@@ -219,36 +234,49 @@ class AreaBinarySensor(BinarySensorEntity):
             del self.hass.data[DOMAIN]['area_sensors'][sensor_key]
 
     def set_state(self, state: bool) -> None:
-        """设置区域状态."""
+        """设置雷达上报的区域状态."""
         self._state = state
+        self._publish_state()
+
+    def set_person_count(self, count: int) -> None:
+        """设置根据人员位置计算的区域人数，与雷达上报的状态取或."""
+        if count == self._person_count:
+            return
+        self._person_count = count
+        self._publish_state()
+
+    def _publish_state(self) -> None:
+        """写入合并后的状态."""
         # 如果实体已经添加到 HA，则触发状态更新
         if self.hass and self.entity_id:
             self.hass.states.async_set(
                 self.entity_id,
-                STATE_ON if state else STATE_OFF,
+                self.state,
                 {
                     "friendly_name": self._name,
                     "device_class": "occupancy",
                     "icon": "mdi:home-account",
+                    "person_count": self._person_count,
                 }
             )
-            _LOGGER.info(f"区域状态已更新: {self.entity_id} -> {STATE_ON if state else STATE_OFF}")
+            _LOGGER.info(f"区域状态已更新: {self.entity_id} -> {self.state}")
 
     @property
     def state(self) -> str:
         """Return the state of the binary sensor."""
-        return STATE_ON if self._state else STATE_OFF
+        return STATE_ON if self.is_on else STATE_OFF
 
     @property
     def is_on(self) -> bool:
         """Return true if the binary sensor is on."""
-        return self._state
+        return self._state or self._person_count > 0
 
     @property
     def extra_state_attributes(self) -> dict:
         """Return the state attributes."""
         return {
             "area_id": self._area_id,
+            "person_count": self._person_count,
             "event_count": self._event_count,
             "last_event_time": self._last_event_time
         }
@@ -108,6 +108,41 @@ IMPORTED_DEVICES_KEY = "imported_devices"
 AES_KEY_HEX = '2ccd05645e070402d8fe30292dfe2933'
 AES_IV_HEX = '00000000000000000000000000000000'
 
+# 消息接收队列相关常量
+INGEST_QUEUE_SIZE = 64             # 每个设备接收队列的最大长度
+INGEST_DROP_POLICY = "drop_oldest" # 数据帧溢出时的丢弃策略: drop_oldest / drop_newest
+
+# 请求应答相关常量
+REQUEST_TIMEOUT = 30  # 等待设备回复的超时时间（秒）
+
+# 户型数据推送相关常量
+LAYOUT_PUSH_CONCURRENCY = 4   # 同时推送户型数据的最大设备数
+LAYOUT_PUSH_MAX_RETRIES = 3   # 单个设备的最大尝试次数
+LAYOUT_PUSH_BACKOFF = 1       # 重试退避基础时间（秒），每次重试翻倍
+
+# 设备在线检测相关常量
+DEVICE_PROBE_AFTER = 60        # 设备静默多久后发送状态查询（秒）
+DEVICE_STALE_AFTER = 180       # 设备静默多久后判定为离线（秒）
+DEVICE_LIVENESS_INTERVAL = 15  # 在线检测间隔（秒）
+
+# 人员位置推送相关常量
+POSITION_UPDATE_RATE = 10   # 每个户型每秒最多推送的位置帧数
+POSITION_DEADBAND = 5       # 位置变化小于该值时不推送（厘米）
+FUSION_GATE = 60            # 不同雷达的目标距离小于该值时视为同一个人（厘米）
+TRAJECTORY_RETENTION_HOURS = 168  # 人员轨迹保留的小时数
+TRAJECTORY_FLUSH_INTERVAL = 10    # 人员轨迹写入文件的间隔（秒）
+TARGET_TTL = 5              # 人员目标超过该时间未更新则移除（秒）
+POSITIONS_RADAR_LOCAL = False  # 雷达上报的是否为自身坐标系，是时按雷达位置和朝向转换为户型坐标
+SNAPSHOT_MAX_AGE = 30       # 设备状态缓存超过该时间才重新查询（秒）
+VIEWER_GRACE_PERIOD = 30    # 最后一个前端离开后延迟停止推送的时间（秒）
+STREAMING_CONCURRENCY = 8   # 同时发送开启/停止推送命令的最大设备数
+OCCUPANCY_CELL_SIZE = 1000  # 占用计算空间网格的格子边长（毫米）
+OCCUPANCY_NUMPY_MIN_BATCH = 32  # 一帧目标数达到该值且已安装 numpy 时使用向量化分类
+
+# 加解密相关常量
+CRYPTO_EXECUTOR_BATCH = 32  # 批量加解密达到该数量时在线程池中执行
+FRAME_CACHE_SIZE = 64       # 按明文缓存的下行帧密文数量
+
 # 事件常量
 EVENT_APARTMENT_VIEW_VISIBLE = f"{DOMAIN}_apartment_view_visible"  # 户型视图可见性事件
 EVENT_DATA_FORMAT_ERROR = "airibes_apartment_data_format_error"
\ No newline at end of file
@@ -0,0 +1,152 @@
+"""Request/response correlation for airibes."""
+import asyncio
+import logging
+import time
+from collections import deque
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PendingRequest:
+    """等待设备回复的请求."""
+
+    __slots__ = ("device_id", "key", "msg_id", "expected", "future", "sent_at")
+
+    def __init__(self, device_id: str, key: str, msg_id, future: asyncio.Future, expected=None):
+        """初始化请求."""
+        self.device_id = device_id
+        self.key = key
+        self.msg_id = msg_id
+        self.expected = expected
+        self.future = future
+        self.sent_at = time.monotonic()
+
+
+class LatencyStats:
+    """请求延迟统计."""
+
+    __slots__ = ("count", "timeouts", "total", "max")
+
+    def __init__(self):
+        """初始化统计数据."""
+        self.count = 0
+        self.timeouts = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def as_dict(self) -> dict:
+        """转换为字典（时间单位：毫秒）."""
+        return {
+            "count": self.count,
+            "timeouts": self.timeouts,
+            "avg_ms": round(self.total * 1000 / self.count, 3) if self.count else 0,
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class RequestTracker:
+    """按设备和 msgId 跟踪进行中的请求，支持同一设备同时有多个请求."""
+
+    def __init__(self):
+        """初始化请求跟踪器."""
+        self._by_msg_id = {}  # (device_id, key, msg_id) -> deque[PendingRequest]
+        self._by_key = {}     # (device_id, key) -> deque[PendingRequest]
+        self._stats = {}      # key -> LatencyStats
+
+    def register(self, device_id: str, key: str, msg_id=None, expected=None) -> PendingRequest:
+        """登记一个等待回复的请求，需在发送前调用.
+
+        Args:
+            device_id: 设备ID
+            key: 期望回复所在的 params key，例如 '74'、'73'
+            msg_id: 请求的 msgId，回复中带有相同 msgId 时精确匹配
+            expected: 不带 msgId 的请求可接受的回复值，为空时接受任何值
+        """
+        request = PendingRequest(
+            device_id, key, msg_id, asyncio.get_running_loop().create_future(), expected
+        )
+        if msg_id is not None:
+            self._by_msg_id.setdefault((device_id, key, msg_id), deque()).append(request)
+        self._by_key.setdefault((device_id, key), deque()).append(request)
+        return request
+
+    def has_pending(self, device_id: str, key: str) -> bool:
+        """是否有等待指定 key 回复的请求."""
+        return bool(self._by_key.get((device_id, key)))
+
+    def resolve(self, device_id: str, key: str, value, msg_id=None) -> bool:
+        """用设备回复完成对应的请求.
+
+        优先按 msgId 精确匹配（相同 msgId 按发送顺序）；没有匹配时只按发送顺序匹配
+        登记时不带 msgId 的请求（设备回复中不返回 msgId，例如 key 74），且回复值
+        必须是请求可接受的值，设备主动上报的其他值不会误完成请求.
+
+        Returns:
+            bool: 是否有请求被完成
+        """
+        request = None
+        if msg_id is not None:
+            queue = self._by_msg_id.get((device_id, key, msg_id))
+            if queue:
+                request = queue[0]
+        if request is None:
+            request = next(
+                (
+                    pending for pending in self._by_key.get((device_id, key), ())
+                    if pending.msg_id is None and (pending.expected is None or value in pending.expected)
+                ),
+                None,
+            )
+            if request is None:
+                return False
+
+        self._discard(request)
+        if request.future.done():
+            return False
+
+        elapsed = time.monotonic() - request.sent_at
+        stats = self._stats.setdefault(key, LatencyStats())
+        stats.count += 1
+        stats.total += elapsed
+        if elapsed > stats.max:
+            stats.max = elapsed
+
+        request.future.set_result(value)
+        return True
+
+    async def async_wait(self, request: PendingRequest, timeout: float):
+        """等待请求的回复，超时抛出 asyncio.TimeoutError."""
+        try:
+            return await asyncio.wait_for(request.future, timeout)
+        except asyncio.TimeoutError:
+            self._stats.setdefault(request.key, LatencyStats()).timeouts += 1
+            _LOGGER.warning("等待设备 %s 回复 Key %s 超时（%s秒）", request.device_id, request.key, timeout)
+            raise
+        finally:
+            self._discard(request)
+
+    def get_stats(self) -> dict:
+        """获取各 key 的请求延迟统计."""
+        return {key: stats.as_dict() for key, stats in self._stats.items()}
+
+    def reset_stats(self) -> None:
+        """清空请求延迟统计."""
+        self._stats.clear()
+
+    def _discard(self, request: PendingRequest) -> None:
+        """从跟踪表中移除请求."""
+        if request.msg_id is not None:
+            self._remove_from(self._by_msg_id, (request.device_id, request.key, request.msg_id), request)
+        self._remove_from(self._by_key, (request.device_id, request.key), request)
+
+    @staticmethod
+    def _remove_from(table: dict, queue_key: tuple, request: PendingRequest) -> None:
+        """从队列表中移除请求，队列为空时删除."""
+        queue = table.get(queue_key)
+        if queue:
+            try:
+                queue.remove(request)
+            except ValueError:
+                pass
+            if not queue:
+                del table[queue_key]
@@ -4,7 +4,7 @@ from cryptography.hazmat.primitives import padding
 from cryptography.hazmat.backends import default_backend
 import base64
 
-from .const import AES_KEY_HEX, AES_IV_HEX
+from .const import AES_KEY_HEX, AES_IV_HEX, CRYPTO_EXECUTOR_BATCH
 
 def encrypt_aes_cbc(key: bytes, iv: bytes, plaintext: str) -> str:
     """使用 AES-128 CBC 模式加密明文."""
@@ -48,14 +48,78 @@ def decrypt_aes_cbc(key: bytes, iv: bytes, ciphertext: str) -> str:
 
     return plaintext.decode('utf-8')
 
+class AesCodec:
+    """AES-128 CBC + Base64 编解码器.
+
+    密钥和 Cipher 对象只在创建时生成一次，每次加解密只创建轻量的上下文，
+    PKCS7 填充直接按字节处理.
+    """
+
+    def __init__(self, key: bytes, iv: bytes, executor_threshold: int = CRYPTO_EXECUTOR_BATCH):
+        """初始化编解码器.
+
+        Args:
+            key: 16 字节密钥
+            iv: 16 字节初始向量
+            executor_threshold: 批量数据达到该数量时异步方法改在线程池中执行
+        """
+        if len(key) != 16 or len(iv) != 16:
+            raise ValueError("Key and IV must be 16 bytes long")
+        self._cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
+        self._block_bytes = algorithms.AES.block_size // 8
+        self._executor_threshold = executor_threshold
+
+    def encrypt(self, plaintext: str) -> str:
+        """加密明文，返回 Base64 编码的密文."""
+        data = plaintext.encode()
+        pad = self._block_bytes - len(data) % self._block_bytes
+        data += bytes((pad,)) * pad
+        encryptor = self._cipher.encryptor()
+        return base64.b64encode(encryptor.update(data) + encryptor.finalize()).decode('utf-8')
+
+    def decrypt(self, ciphertext: str) -> str:
+        """解密 Base64 编码的密文."""
+        return self.decrypt_bytes(ciphertext).decode('utf-8')
+
+    def decrypt_bytes(self, ciphertext) -> bytes:
+        """解密 Base64 编码的密文，返回未解码的明文字节."""
+        decryptor = self._cipher.decryptor()
+        padded = decryptor.update(base64.b64decode(ciphertext)) + decryptor.finalize()
+        pad = padded[-1] if padded else 0
+        if not 1 <= pad <= self._block_bytes or padded[-pad:] != bytes((pad,)) * pad:
+            raise ValueError("Invalid padding bytes.")
+        return padded[:-pad]
+
+    def encrypt_batch(self, plaintexts) -> list:
+        """批量加密."""
+        encrypt = self.encrypt
+        return [encrypt(plaintext) for plaintext in plaintexts]
+
+    def decrypt_batch(self, ciphertexts) -> list:
+        """批量解密."""
+        decrypt = self.decrypt
+        return [decrypt(ciphertext) for ciphertext in ciphertexts]
+
+    async def async_encrypt_batch(self, hass, plaintexts: list) -> list:
+        """批量加密，数量较多时在线程池中执行，避免阻塞事件循环."""
+        if len(plaintexts) >= self._executor_threshold:
+            return await hass.async_add_executor_job(self.encrypt_batch, plaintexts)
+        return self.encrypt_batch(plaintexts)
+
+    async def async_decrypt_batch(self, hass, ciphertexts: list) -> list:
+        """批量解密，数量较多时在线程池中执行，避免阻塞事件循环."""
+        if len(ciphertexts) >= self._executor_threshold:
+            return await hass.async_add_executor_job(self.decrypt_batch, ciphertexts)
+        return self.decrypt_batch(ciphertexts)
+
+
+# 默认密钥的编解码器
+codec = AesCodec(bytes.fromhex(AES_KEY_HEX), bytes.fromhex(AES_IV_HEX))
+
 def encrypt_data(plaintext: str) -> str:
     """加密数据的便捷方法."""
-    KEY = bytes.fromhex(AES_KEY_HEX)
-    IV = bytes.fromhex(AES_IV_HEX)
-    return encrypt_aes_cbc(KEY, IV, plaintext)
+    return codec.encrypt(plaintext)
 
 def decrypt_data(ciphertext: str) -> str:
     """解密数据的便捷方法."""
-    KEY = bytes.fromhex(AES_KEY_HEX)
-    IV = bytes.fromhex(AES_IV_HEX)
-    return decrypt_aes_cbc(KEY, IV, ciphertext) 
\ No newline at end of file
+    return codec.decrypt(ciphertext)
@@ -0,0 +1,112 @@
+"""Message dispatcher for airibes."""
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+# 未注册键（交给 fallback 处理或直接忽略）的统计桶名称
+UNHANDLED = "unhandled"
+
+
+class HandlerStats:
+    """单个处理器的统计数据."""
+
+    __slots__ = ("hits", "errors", "total_time", "max_time")
+
+    def __init__(self):
+        """初始化统计数据."""
+        self.hits = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def as_dict(self) -> dict:
+        """转换为字典（时间单位：毫秒）."""
+        return {
+            "hits": self.hits,
+            "errors": self.errors,
+            "total_ms": round(self.total_time * 1000, 3),
+            "avg_ms": round(self.total_time * 1000 / self.hits, 3) if self.hits else 0,
+            "max_ms": round(self.max_time * 1000, 3),
+        }
+
+
+class MessageDispatcher:
+    """基于注册表的消息分发器，按键查找处理器并记录命中次数和耗时."""
+
+    def __init__(self, name: str):
+        """初始化分发器.
+
+        Args:
+            name: 分发器名称，用于日志
+        """
+        self.name = name
+        self._handlers = {}
+        self._stats = {}
+        self._unhandled = HandlerStats()
+        self._fallback = None
+
+    def register(self, key, handler) -> None:
+        """注册处理器，已存在时覆盖.
+
+        Args:
+            key: 分发键（cmd 或 params 中的 key）
+            handler: 异步处理函数
+        """
+        self._handlers[key] = handler
+        self._stats.setdefault(key, HandlerStats())
+
+    def unregister(self, key) -> None:
+        """注销处理器."""
+        self._handlers.pop(key, None)
+
+    def set_fallback(self, handler) -> None:
+        """设置未注册键的处理器."""
+        self._fallback = handler
+
+    def has_handler(self, key) -> bool:
+        """检查是否注册了处理器."""
+        return key in self._handlers
+
+    async def async_dispatch(self, key, *args) -> bool:
+        """分发消息.
+
+        Returns:
+            bool: 是否找到已注册的处理器
+        """
+        handler = self._handlers.get(key)
+        if handler is None:
+            # 未注册的键单独计数，不混入已注册处理器的统计
+            await self._async_call(self._unhandled, key, self._fallback, key, *args)
+            return False
+
+        await self._async_call(self._stats[key], key, handler, *args)
+        return True
+
+    async def _async_call(self, stats: HandlerStats, key, handler, *args) -> None:
+        """调用处理器并记录命中次数和耗时，handler 为 None 时只计数."""
+        start = time.perf_counter()
+        try:
+            if handler is not None:
+                await handler(*args)
+        except Exception as e:
+            stats.errors += 1
+            _LOGGER.error("%s 处理 Key %s 失败: %s", self.name, key, str(e))
+        finally:
+            elapsed = time.perf_counter() - start
+            stats.hits += 1
+            stats.total_time += elapsed
+            if elapsed > stats.max_time:
+                stats.max_time = elapsed
+
+    def get_stats(self) -> dict:
+        """获取各处理器的统计数据，未注册键的统计在 UNHANDLED 下."""
+        stats = {str(key): stats.as_dict() for key, stats in self._stats.items()}
+        stats[UNHANDLED] = self._unhandled.as_dict()
+        return stats
+
+    def reset_stats(self) -> None:
+        """清空统计数据."""
+        for key in self._stats:
+            self._stats[key] = HandlerStats()
+        self._unhandled = HandlerStats()
@@ -0,0 +1,64 @@
+"""Outbound frame builder for airibes."""
+import time
+from collections import OrderedDict
+
+from .crypto_utils import codec as default_codec
+from .serializer import dumps
+
+# 下行帧外层格式，data 为 Base64 密文，无需转义
+_FRAME_WITH_DATA = '{"cmd":%d,"dir":"30","msgId":%s,"prio":%d,"ver":"2.3","timestamp":%d,"data":"%s"}'
+_FRAME_WITHOUT_DATA = '{"cmd":%d,"dir":"30","msgId":%s,"prio":%d,"ver":"2.3","timestamp":%d}'
+
+
+class FrameBuilder:
+    """构建下行帧并缓存加密后的数据.
+
+    - 通过 static_key 注册的不可变数据只序列化和加密一次
+    - 其他数据按明文缓存最近的密文，重复的指令（例如开关推送、状态查询）无需重新加密
+    """
+
+    def __init__(self, cache_size: int, codec=default_codec):
+        """初始化帧构建器.
+
+        Args:
+            cache_size: 按明文缓存的密文数量
+            codec: 加解密编解码器
+        """
+        self._codec = codec
+        self._cache_size = cache_size
+        self._static = {}           # static_key -> 密文
+        self._cache = OrderedDict()  # 明文 -> 密文
+
+    def encrypt_body(self, data, static_key: str = None) -> str:
+        """获取数据加密后的内容.
+
+        Args:
+            data: 要发送的数据
+            static_key: 不可变数据的缓存键，相同键的数据必须始终相同
+        """
+        if static_key is not None:
+            body = self._static.get(static_key)
+            if body is None:
+                body = self._static[static_key] = self._codec.encrypt(dumps(data))
+            return body
+
+        plaintext = dumps(data)
+        cache = self._cache
+        body = cache.get(plaintext)
+        if body is not None:
+            cache.move_to_end(plaintext)
+            return body
+        body = cache[plaintext] = self._codec.encrypt(plaintext)
+        if len(cache) > self._cache_size:
+            cache.popitem(last=False)
+        return body
+
+    def build(self, cmd: int, prio: int, msg_id: int, data=None, static_key: str = None) -> str:
+        """构建下行帧，只在发送时填入 msgId 和时间戳."""
+        timestamp = int(time.time() * 1000)
+        if type(msg_id) is not int:
+            # 回复设备时 msgId 来自上行帧，类型不确定
+            msg_id = dumps(msg_id)
+        if not data:
+            return _FRAME_WITHOUT_DATA % (cmd, msg_id, prio, timestamp)
+        return _FRAME_WITH_DATA % (cmd, msg_id, prio, timestamp, self.encrypt_body(data, static_key))
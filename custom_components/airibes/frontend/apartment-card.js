@@ -159,6 +159,10 @@ class ApartmentCard extends HTMLElement {
                     currentApartmentId = apartments[0].id;
                 }
             }
+            this.currentApartmentId = currentApartmentId;
+            if (this.isConnected) {
+                await this._subscribePositions();
+            }
 
             // 加载指定户型的数据
             const response = await this._hass.callWS({
@@ -746,25 +750,16 @@ class ApartmentCard extends HTMLElement {
     }
 
     async connectedCallback() {
-        // 发送户型视图可见事件
+        // 订阅当前户型的人员位置，订阅期间户型中的雷达保持推送
         if (this._hass) {
-            await this._hass.callWS({
-                type: 'airibes/set_apartment_view_visible',
-                visible: true,
-                apartment_id: this.currentApartmentId,
-            });
-
-            // 订阅人员位置更新事件
-            this._personPositionHandler = (event) => this._handlePersonPositionsUpdate(event);
-            const unsub = this._hass.connection.subscribeEvents(
-                this._personPositionHandler,
-                'airibes_person_positions_update'
-            );
-            this._unsubs.push(unsub);
+            await this._subscribePositions();
         }
     }
 
     disconnectedCallback() {
+        // 取消人员位置订阅，后端在最后一个订阅者离开后停止雷达推送
+        this._unsubscribePositions();
+
         // 清理事件订阅
         if (this._unsubs) {
             while (this._unsubs.length) {
@@ -774,23 +769,57 @@ class ApartmentCard extends HTMLElement {
                 }
             }
         }
+    }
 
-        // 通知后端户型视图不可见
-        if (this._hass) {
-            this._hass.callWS({
-                type: 'airibes/set_apartment_view_visible',
-                visible: false,
-                apartment_id: this.currentApartmentId || 1
-            }).catch(error => {
-                console.error('通知后端户型视图不可见失败:', error);
-            });
+    // 订阅当前户型的人员位置，户型变化时重新订阅
+    async _subscribePositions() {
+        const apartmentId = this.currentApartmentId;
+        if (this._positionsRequest && this._positionsRequest.apartmentId === apartmentId) {
+            return;
         }
+        this._unsubscribePositions();
+        const request = (this._positionsRequest = { apartmentId });
+        const unsub = await this._hass.connection.subscribeMessage(
+            (message) => this._handlePersonPositionsUpdate(message),
+            {
+                type: 'airibes/subscribe_positions',
+                apartment_id: apartmentId,
+                delta: true
+            }
+        );
+        if (this._positionsRequest !== request) {
+            // 等待订阅期间已取消或切换了户型
+            unsub();
+            return;
+        }
+        this._unsubPositions = unsub;
+    }
+
+    _unsubscribePositions() {
+        if (this._unsubPositions) {
+            this._unsubPositions();
+            this._unsubPositions = undefined;
+        }
+        this._positionsRequest = undefined;
+        this.personPositions.clear();
     }
 
-    // 添加人员位置更新处理方法
-    _handlePersonPositionsUpdate(event) {
-        const { device_id, positions } = event.data;
-        this.personPositions.set(device_id, positions);
+    // 添加人员位置更新处理方法（首帧为完整数据，之后只包含变化的目标）
+    _handlePersonPositionsUpdate(message) {
+        if (message.full) {
+            this.personPositions = new Map(Object.entries(message.devices));
+        } else {
+            message.removed_devices.forEach(deviceId => this.personPositions.delete(deviceId));
+            Object.entries(message.removed).forEach(([deviceId, targetIds]) => {
+                const positions = this.personPositions.get(deviceId) || [];
+                this.personPositions.set(deviceId, positions.filter(pos => !targetIds.includes(pos.id)));
+            });
+            Object.entries(message.devices).forEach(([deviceId, changed]) => {
+                const positions = new Map((this.personPositions.get(deviceId) || []).map(pos => [pos.id, pos]));
+                changed.forEach(pos => positions.set(pos.id, pos));
+                this.personPositions.set(deviceId, Array.from(positions.values()));
+            });
+        }
         // 重新绘制以更新人员位置
         this.drawApartment();
     }
@@ -70,14 +70,6 @@ export class ApartmentView extends HTMLElement {
       "airibes_apartment_data_format_error"
     );
 
-    // 发送户型视图可见事件
-    if (this.hass) {
-      await this.hass.callWS({
-        type: "airibes/set_apartment_view_visible",
-        visible: true,
-        apartment_id: this.currentApartmentId,
-      });
-    }
     await this.loadStyles();
     this.render(); // 先渲染 DOM
     this.initializeCanvas();
@@ -85,11 +77,8 @@ export class ApartmentView extends HTMLElement {
     await this.loadDevices(); // 加载设备数据
     await this.loadApartmentData(); // 最后加载户型数据
 
-    // 订阅人员位置更新事件
-    this.hass.connection.subscribeEvents(
-      (event) => this._handlePersonPositionsUpdate(event),
-      "airibes_person_positions_update"
-    );
+    // 订阅当前户型的人员位置，订阅期间户型中的雷达保持推送
+    await this._subscribePositions();
   }
 
   disconnectedCallback() {
@@ -99,14 +88,9 @@ export class ApartmentView extends HTMLElement {
     //     this._unsubDataFormatError = undefined;
     // }
 
-    // 发送户型视图不可见事件
-    if (this.hass) {
-      this.hass.callWS({
-        type: "airibes/set_apartment_view_visible",
-        visible: false,
-        apartment_id: this.currentApartmentId,
-      });
-    }
+    // 取消人员位置订阅，后端在最后一个订阅者离开后停止雷达推送
+    this._unsubscribePositions();
+
     if (this.resizeObserver) {
       this.resizeObserver.disconnect();
     }
@@ -1014,6 +998,7 @@ export class ApartmentView extends HTMLElement {
           this.currentFloorId = apartment.floor_id;
         }
         await this.restoreApartmentData(response.data);
+        await this._subscribePositions();
       }
     } catch (error) {
       this.showToast(this.translate("switch_apartment_failed"));
@@ -4888,16 +4873,62 @@ export class ApartmentView extends HTMLElement {
     });
   }
 
-  _handlePersonPositionsUpdate(event) {
-    const { device_id, positions } = event.data;
-    // 检查设备是否在房间内
-    const device = this.placedDevices.find(
-      (device) => device.type === "radar" && device.id === device_id
+  // 订阅当前户型的人员位置，户型切换时重新订阅
+  async _subscribePositions() {
+    const apartmentId = this.currentApartmentId;
+    if (this._positionsRequest && this._positionsRequest.apartmentId === apartmentId) {
+      return;
+    }
+    this._unsubscribePositions();
+    const request = (this._positionsRequest = { apartmentId });
+    const unsub = await this.hass.connection.subscribeMessage(
+      (message) => this._handlePersonPositionsUpdate(message),
+      {
+        type: "airibes/subscribe_positions",
+        apartment_id: apartmentId,
+        delta: true,
+      }
     );
-    if (!device) {
+    if (this._positionsRequest !== request) {
+      // 等待订阅期间已取消或切换了户型
+      unsub();
       return;
     }
-    this.personPositions.set(device_id, positions);
+    this._unsubPositions = unsub;
+  }
+
+  _unsubscribePositions() {
+    if (this._unsubPositions) {
+      this._unsubPositions();
+      this._unsubPositions = undefined;
+    }
+    this._positionsRequest = undefined;
+    this.personPositions.clear();
+  }
+
+  _handlePersonPositionsUpdate(message) {
+    if (message.full) {
+      this.personPositions = new Map(Object.entries(message.devices));
+    } else {
+      // 增量帧只包含变化的目标
+      message.removed_devices.forEach((deviceId) =>
+        this.personPositions.delete(deviceId)
+      );
+      Object.entries(message.removed).forEach(([deviceId, targetIds]) => {
+        const positions = this.personPositions.get(deviceId) || [];
+        this.personPositions.set(
+          deviceId,
+          positions.filter((pos) => !targetIds.includes(pos.id))
+        );
+      });
+      Object.entries(message.devices).forEach(([deviceId, changed]) => {
+        const positions = new Map(
+          (this.personPositions.get(deviceId) || []).map((pos) => [pos.id, pos])
+        );
+        changed.forEach((pos) => positions.set(pos.id, pos));
+        this.personPositions.set(deviceId, Array.from(positions.values()));
+      });
+    }
     this.drawPersonPositions(); // 重新绘制人员位置
   }
 
@@ -0,0 +1,185 @@
+"""Multi-radar target fusion for airibes."""
+from typing import NamedTuple
+
+_NEIGHBOURS = tuple((dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1))
+
+
+class Track(NamedTuple):
+    """上一帧输出的融合目标."""
+
+    keys: frozenset  # 组成该目标的 (device_id, 目标ID)
+    owner: tuple     # 输出时归属的 (device_id, 目标ID)
+    x: float
+    y: float
+
+
+def _candidate_pairs(detections: list, gate: float) -> list:
+    """查找不同雷达之间距离不超过门限的检测对.
+
+    检测按边长为门限的网格分桶，每个检测只与相邻格子比较.
+
+    Returns:
+        list: [(距离平方, i, j)]，按距离从近到远排序
+    """
+    grid = {}
+    for index, (_device_id, _target_id, x, y) in enumerate(detections):
+        grid.setdefault((int(x // gate), int(y // gate)), []).append(index)
+
+    gate_sq = gate * gate
+    pairs = []
+    for (cx, cy), indices in grid.items():
+        for dx, dy in _NEIGHBOURS:
+            others = grid.get((cx + dx, cy + dy))
+            if not others:
+                continue
+            for i in indices:
+                device_i, _id, xi, yi = detections[i]
+                for j in others:
+                    if j <= i:
+                        continue
+                    device_j, _id, xj, yj = detections[j]
+                    if device_i == device_j:
+                        continue
+                    dist_sq = (xi - xj) ** 2 + (yi - yj) ** 2
+                    if dist_sq <= gate_sq:
+                        pairs.append((dist_sq, i, j))
+    pairs.sort()
+    return pairs
+
+
+def cluster_detections(detections: list, gate: float) -> list:
+    """将不同雷达看到的同一个人聚为一簇.
+
+    候选对按距离从近到远贪心合并，同一簇中每个雷达最多保留一个检测.
+
+    Args:
+        detections: [(device_id, 目标ID, x, y)]
+        gate: 关联门限，与坐标单位相同
+
+    Returns:
+        list: [[检测下标]]
+    """
+    cluster_of = list(range(len(detections)))
+    members = {index: [index] for index in cluster_of}
+    devices = {index: {detections[index][0]} for index in cluster_of}
+
+    for _dist_sq, i, j in _candidate_pairs(detections, gate):
+        ci, cj = cluster_of[i], cluster_of[j]
+        if ci == cj or not devices[ci].isdisjoint(devices[cj]):
+            continue
+        if len(members[ci]) < len(members[cj]):
+            ci, cj = cj, ci
+        for index in members[cj]:
+            cluster_of[index] = ci
+        members[ci].extend(members.pop(cj))
+        devices[ci] |= devices.pop(cj)
+
+    return list(members.values())
+
+
+class TargetFusion:
+    """合并户型内多个雷达在重叠区域看到的同一个人.
+
+    每帧先按关联门限聚簇，再为每簇沿用上一帧的融合ID：优先匹配包含相同 (雷达, 目标ID) 的目标，
+    其次在门限内就近匹配，都没有时分配新ID. 每簇输出一个目标，位置取簇内平均值，
+    归属于其中一个雷达并保留该雷达的目标ID（前端删除目标时需要）.
+    """
+
+    def __init__(self, gate: float):
+        """初始化目标融合.
+
+        Args:
+            gate: 关联门限（厘米）
+        """
+        self._gate = gate
+        self._tracks = {}   # apartment_id -> {track_id: Track}
+        self._next_id = {}  # apartment_id -> 下一个融合ID
+
+    def fuse(self, apartment_id, frame: dict) -> dict:
+        """融合户型一帧的人员位置.
+
+        Args:
+            frame: {device_id: [{"id", "x", "y"}]}
+
+        Returns:
+            dict: 与输入格式相同，重复的目标只保留一个，每个目标增加融合ID "track"
+        """
+        detections = [
+            (device_id, pos["id"], pos["x"], pos["y"])
+            for device_id, positions in frame.items()
+            for pos in positions
+        ]
+        fused = {device_id: [] for device_id in frame}
+        if not detections:
+            self._tracks.pop(apartment_id, None)
+            return fused
+
+        clusters = cluster_detections(detections, self._gate)
+        previous = self._tracks.get(apartment_id, {})
+        track_ids = self._match_tracks(apartment_id, detections, clusters, previous)
+
+        tracks = {}
+        for cluster, track_id in zip(clusters, track_ids):
+            keys = frozenset((detections[i][0], detections[i][1]) for i in cluster)
+            x = sum(detections[i][2] for i in cluster) / len(cluster)
+            y = sum(detections[i][3] for i in cluster) / len(cluster)
+            track = previous.get(track_id)
+            if track is not None and track.owner in keys:
+                owner = track.owner
+            else:
+                owner = min(keys, key=str)
+            tracks[track_id] = Track(keys, owner, x, y)
+            fused[owner[0]].append({"id": owner[1], "x": x, "y": y, "track": track_id})
+
+        self._tracks[apartment_id] = tracks
+        return fused
+
+    def remove(self, apartment_id) -> None:
+        """忘记户型的融合状态."""
+        self._tracks.pop(apartment_id, None)
+
+    def _match_tracks(self, apartment_id, detections: list, clusters: list, previous: dict) -> list:
+        """为每簇选择融合ID."""
+        key_to_track = {key: track_id for track_id, track in previous.items() for key in track.keys}
+        track_ids = [None] * len(clusters)
+        used = set()
+
+        # 雷达自身的目标ID是稳定的，包含相同 (雷达, 目标ID) 时直接沿用
+        unmatched = []
+        for index, cluster in enumerate(clusters):
+            for i in cluster:
+                track_id = key_to_track.get((detections[i][0], detections[i][1]))
+                if track_id is not None and track_id not in used:
+                    track_ids[index] = track_id
+                    used.add(track_id)
+                    break
+            else:
+                unmatched.append(index)
+
+        # 新出现的目标（例如从一个雷达移交到另一个雷达）在门限内就近匹配剩余的轨迹，
+        # 此时两边数量都很少，直接比较所有组合
+        free = [(track_id, track) for track_id, track in previous.items() if track_id not in used]
+        if unmatched and free:
+            gate_sq = self._gate * self._gate
+            pairs = []
+            for index in unmatched:
+                cluster = clusters[index]
+                x = sum(detections[i][2] for i in cluster) / len(cluster)
+                y = sum(detections[i][3] for i in cluster) / len(cluster)
+                for track_id, track in free:
+                    dist_sq = (x - track.x) ** 2 + (y - track.y) ** 2
+                    if dist_sq <= gate_sq:
+                        pairs.append((dist_sq, index, track_id))
+            pairs.sort()
+            for _dist_sq, index, track_id in pairs:
+                if track_ids[index] is None and track_id not in used:
+                    track_ids[index] = track_id
+                    used.add(track_id)
+
+        next_id = self._next_id.get(apartment_id, 1)
+        for index, track_id in enumerate(track_ids):
+            if track_id is None:
+                track_ids[index] = next_id
+                next_id += 1
+        self._next_id[apartment_id] = next_id
+        return track_ids
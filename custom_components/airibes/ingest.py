@@ -0,0 +1,162 @@
+"""Per-device ingest queues for airibes."""
+import asyncio
+import logging
+from collections import deque
+
+_LOGGER = logging.getLogger(__name__)
+
+# 帧类型
+FRAME_CONTROL = "control"    # 控制帧（2004/2012/2014），永不丢弃
+FRAME_POSITION = "position"  # 位置帧（仅含 key 76/78），溢出时只保留最新
+FRAME_DATA = "data"          # 其他数据帧，溢出时按丢弃策略处理
+
+# 丢弃策略
+DROP_OLDEST = "drop_oldest"  # 丢弃队列中最旧的数据帧
+DROP_NEWEST = "drop_newest"  # 丢弃新到达的数据帧（位置帧仍会挤掉最旧的数据帧）
+
+CONTROL_CMDS = frozenset((2004, 2012, 2014))
+POSITION_KEYS = frozenset(("76", "78"))
+
+
+class IngestFrame:
+    """已解码的上行帧."""
+
+    __slots__ = ("cmd", "payload", "kind")
+
+    def __init__(self, cmd: int, payload: dict, kind: str):
+        """初始化帧."""
+        self.cmd = cmd
+        self.payload = payload
+        self.kind = kind
+
+
+def classify_frame(cmd: int, params: list = None) -> str:
+    """判断帧类型.
+
+    Args:
+        cmd: 命令ID
+        params: 已解密的 params 列表（仅 cmd 2006）
+    """
+    if cmd in CONTROL_CMDS:
+        return FRAME_CONTROL
+    if cmd == 2006 and params and all(key in POSITION_KEYS for param in params for key in param):
+        return FRAME_POSITION
+    return FRAME_DATA
+
+
+class DeviceQueue:
+    """单个设备的有界帧队列."""
+
+    __slots__ = ("frames", "event", "worker", "dropped")
+
+    def __init__(self):
+        """初始化队列."""
+        self.frames = deque()
+        self.event = asyncio.Event()
+        self.worker = None
+        self.dropped = 0
+
+
+class IngestQueues:
+    """按设备划分的有界接收队列，由每设备一个的工作任务顺序处理."""
+
+    def __init__(self, handler, max_size: int, drop_policy: str = DROP_OLDEST):
+        """初始化接收队列.
+
+        Args:
+            handler: 异步处理函数，参数为 (device_id, frame)
+            max_size: 每个设备队列的最大长度（控制帧不受限制）
+            drop_policy: 数据帧溢出时的丢弃策略
+        """
+        self._handler = handler
+        self._max_size = max_size
+        self._drop_policy = drop_policy
+        self._queues = {}
+
+    def put(self, device_id: str, frame: IngestFrame) -> bool:
+        """将帧放入设备队列.
+
+        Returns:
+            bool: 帧是否被接收
+        """
+        queue = self._queues.get(device_id)
+        if queue is None:
+            queue = self._queues[device_id] = DeviceQueue()
+
+        frames = queue.frames
+        if frame.kind != FRAME_CONTROL and len(frames) >= self._max_size:
+            if not self._make_room(queue, frame):
+                queue.dropped += 1
+                return False
+
+        frames.append(frame)
+        queue.event.set()
+        if queue.worker is None or queue.worker.done():
+            queue.worker = asyncio.create_task(self._drain(device_id, queue))
+        return True
+
+    def _make_room(self, queue: DeviceQueue, frame: IngestFrame) -> bool:
+        """队列已满时腾出空间，返回新帧能否入队."""
+        frames = queue.frames
+        if frame.kind == FRAME_POSITION:
+            # 位置帧只保留最新一帧
+            stale = [f for f in frames if f.kind == FRAME_POSITION]
+            if stale:
+                for f in stale:
+                    frames.remove(f)
+                queue.dropped += len(stale)
+                return True
+        elif self._drop_policy == DROP_NEWEST:
+            # 丢弃策略只作用于新到达的数据帧，最新的位置帧总是入队
+            return False
+
+        # 优先丢弃最旧的数据帧，其次是较旧的位置帧，始终保留最新的位置帧
+        victim = next((f for f in frames if f.kind == FRAME_DATA), None)
+        if victim is None:
+            positions = [f for f in frames if f.kind == FRAME_POSITION]
+            if len(positions) > 1:
+                victim = positions[0]
+        if victim is not None:
+            frames.remove(victim)
+            queue.dropped += 1
+        return True
+
+    async def _drain(self, device_id: str, queue: DeviceQueue) -> None:
+        """按顺序处理设备队列中的帧."""
+        frames = queue.frames
+        while True:
+            if not frames:
+                queue.event.clear()
+                await queue.event.wait()
+                continue
+            frame = frames.popleft()
+            try:
+                await self._handler(device_id, frame)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                _LOGGER.error("处理设备 %s 的消息失败: %s", device_id, str(e))
+
+    def get_stats(self) -> dict:
+        """获取各设备队列长度和丢弃数量."""
+        return {
+            device_id: {"pending": len(queue.frames), "dropped": queue.dropped}
+            for device_id, queue in self._queues.items()
+        }
+
+    def reset_stats(self) -> None:
+        """清空各设备的丢弃数量."""
+        for queue in self._queues.values():
+            queue.dropped = 0
+
+    async def async_stop(self) -> None:
+        """停止所有工作任务."""
+        workers = [queue.worker for queue in self._queues.values() if queue.worker]
+        for worker in workers:
+            worker.cancel()
+        for worker in workers:
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        self._queues.clear()
@@ -0,0 +1,239 @@
+"""Device layout index for airibes."""
+import asyncio
+import hashlib
+import json
+import logging
+from typing import NamedTuple
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import STORAGE_VERSION, APARTMENTS_STORAGE_KEY, APARTMENT_DATA_KEY
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DeviceLocation(NamedTuple):
+    """设备在户型中的位置."""
+
+    apartment_id: int
+    room_id: int
+    area_ids: frozenset
+
+
+# 参与计算户型版本号的设备数据字段
+VERSION_FIELDS = ("radar", "roomRegion", "region", "furniture")
+
+
+def compute_layout_version(apartment_id, device_data: dict) -> str:
+    """根据设备户型数据内容计算版本号.
+
+    相同的雷达位姿、房间、区域和家具数据总是得到相同的版本号，
+    格式与前端生成的版本号兼容: HASS_{内容哈希}_{户型ID}
+    """
+    content = {field: device_data.get(field) for field in VERSION_FIELDS}
+    encoded = json.dumps(content, sort_keys=True, separators=(',', ':'))
+    digest = hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+    return f"HASS_{digest[:16]}_{apartment_id}"
+
+
+def build_area_routes(sender_data: dict) -> list:
+    """根据 sender_data 生成区域路由表.
+
+    Returns:
+        list: [{"area-id": 区域ID, "devices": [包含该区域的设备ID]}]
+    """
+    routes = {}
+    for device_id, device_info in (sender_data or {}).items():
+        for region in device_info.get('region', []):
+            area_id = region.get('area-id')
+            if area_id is None:
+                continue
+            devices = routes.setdefault(area_id, [])
+            if device_id not in devices:
+                devices.append(device_id)
+    return [{"area-id": area_id, "devices": devices} for area_id, devices in routes.items()]
+
+
+def build_common_doors(sender_data: dict) -> dict:
+    """根据 sender_data 生成共用门表.
+
+    共用门是指同时出现在两个及以上设备区域中的门区域（area-attribute == 2）.
+
+    Returns:
+        dict: {设备ID: [共用门区域ID]}
+    """
+    door_devices = {}
+    for device_id, device_info in (sender_data or {}).items():
+        for region in device_info.get('region', []):
+            if region.get('area-attribute') == 2 and region.get('area-id') is not None:
+                door_devices.setdefault(region['area-id'], set()).add(device_id)
+
+    common_doors = {}
+    for door_id, devices in door_devices.items():
+        if len(devices) < 2:
+            continue
+        for device_id in devices:
+            common_doors.setdefault(device_id, []).append(door_id)
+    return common_doors
+
+
+class LayoutIndex:
+    """常驻内存的设备布局索引，按设备ID查找户型/房间/区域."""
+
+    def __init__(self, hass: HomeAssistant):
+        """初始化布局索引."""
+        self.hass = hass
+        self._devices = {}      # device_id -> DeviceLocation
+        self._apartments = {}   # apartment_id -> sender_data
+        self._routes = {}       # (apartment_id, area_id) -> (device_id, ...)
+        self._common_doors = {} # device_id -> frozenset(door_id)
+        self._listeners = []
+        self._lock = asyncio.Lock()
+
+    def add_listener(self, listener):
+        """注册布局变化监听，参数为发生变化的户型ID列表.
+
+        Returns:
+            取消监听的函数
+        """
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def _notify(self, apartment_ids) -> None:
+        """通知监听者布局已变化."""
+        for listener in list(self._listeners):
+            listener(list(apartment_ids))
+
+    def get(self, device_id: str):
+        """获取设备位置，不存在时返回 None."""
+        return self._devices.get(device_id)
+
+    def get_sender_data(self, apartment_id: int) -> dict:
+        """获取户型缓存的 sender_data."""
+        return self._apartments.get(apartment_id, {})
+
+    def get_area_peers(self, device_id: str, area_id) -> tuple:
+        """获取与设备共享区域的其他设备ID."""
+        location = self._devices.get(device_id)
+        if not location:
+            return ()
+        devices = self._routes.get((location.apartment_id, area_id), ())
+        return tuple(peer for peer in devices if peer != device_id)
+
+    def get_common_doors(self, device_id: str) -> frozenset:
+        """获取设备的共用门区域ID."""
+        return self._common_doors.get(device_id, frozenset())
+
+    def get_version(self, device_id: str):
+        """获取设备当前户型数据的版本号."""
+        location = self._devices.get(device_id)
+        if not location:
+            return None
+        return self._apartments[location.apartment_id].get(device_id, {}).get('version')
+
+    async def async_rebuild(self) -> None:
+        """从存储重建整个索引."""
+        async with self._lock:
+            apartments_store = Store(self.hass, STORAGE_VERSION, APARTMENTS_STORAGE_KEY)
+            apartments_data = await apartments_store.async_load()
+
+            apartments = {}
+            routes = {}
+            doors = {}
+            if apartments_data and 'apartments' in apartments_data:
+                for apartment in apartments_data['apartments']:
+                    apartment_id = apartment['id']
+                    sender_store = Store(self.hass, STORAGE_VERSION, f"{APARTMENT_DATA_KEY}_{apartment_id}_sender")
+                    apartments[apartment_id] = await sender_store.async_load() or {}
+
+                    # 优先使用持久化的路由表，不存在时根据 sender_data 生成
+                    routes_store = Store(self.hass, STORAGE_VERSION, f"{APARTMENT_DATA_KEY}_{apartment_id}_routes")
+                    apartment_routes = await routes_store.async_load()
+                    if apartment_routes is None:
+                        apartment_routes = build_area_routes(apartments[apartment_id])
+                    routes[apartment_id] = apartment_routes
+
+                    doors_store = Store(self.hass, STORAGE_VERSION, f"{APARTMENT_DATA_KEY}_{apartment_id}_doors")
+                    apartment_doors = await doors_store.async_load()
+                    if apartment_doors is None:
+                        apartment_doors = build_common_doors(apartments[apartment_id])
+                    doors[apartment_id] = apartment_doors
+
+            self._apartments = apartments
+            self._reindex()
+            self._set_routes(routes)
+            self._set_common_doors(doors)
+            _LOGGER.debug("布局索引已重建: %d 个设备", len(self._devices))
+        self._notify(self._apartments)
+
+    async def async_update_apartment(self, apartment_id: int, sender_data: dict) -> None:
+        """更新单个户型的索引并持久化路由表和共用门表."""
+        async with self._lock:
+            self._apartments[apartment_id] = sender_data or {}
+            self._reindex()
+            await self._async_save_derived([apartment_id])
+        self._notify([apartment_id])
+
+    async def async_remove_device(self, device_id: str) -> None:
+        """从索引中移除设备."""
+        async with self._lock:
+            changed = [
+                apartment_id for apartment_id, sender_data in self._apartments.items()
+                if device_id in sender_data
+            ]
+            self._apartments = {
+                apartment_id: {k: v for k, v in sender_data.items() if k != device_id}
+                for apartment_id, sender_data in self._apartments.items()
+            }
+            self._reindex()
+            await self._async_save_derived(changed)
+        self._notify(changed)
+
+    async def _async_save_derived(self, apartment_ids: list) -> None:
+        """重新生成路由表和共用门表，并保存指定户型的数据."""
+        routes = {}
+        doors = {}
+        for apartment_id, sender_data in self._apartments.items():
+            routes[apartment_id] = build_area_routes(sender_data)
+            doors[apartment_id] = build_common_doors(sender_data)
+        self._set_routes(routes)
+        self._set_common_doors(doors)
+
+        for apartment_id in apartment_ids:
+            routes_store = Store(self.hass, STORAGE_VERSION, f"{APARTMENT_DATA_KEY}_{apartment_id}_routes")
+            await routes_store.async_save(routes[apartment_id])
+            doors_store = Store(self.hass, STORAGE_VERSION, f"{APARTMENT_DATA_KEY}_{apartment_id}_doors")
+            await doors_store.async_save(doors[apartment_id])
+
+    def _set_routes(self, routes: dict) -> None:
+        """将各户型的路由表展开为 (户型, 区域) 查找表."""
+        table = {}
+        for apartment_id, apartment_routes in routes.items():
+            for route in apartment_routes:
+                table[(apartment_id, route["area-id"])] = tuple(route["devices"])
+        self._routes = table
+
+    def _set_common_doors(self, doors: dict) -> None:
+        """合并各户型的共用门表."""
+        table = {}
+        for apartment_doors in doors.values():
+            for device_id, door_ids in apartment_doors.items():
+                table[device_id] = table.get(device_id, frozenset()) | frozenset(door_ids)
+        self._common_doors = table
+
+    def _reindex(self) -> None:
+        """根据缓存的 sender_data 重新生成设备索引."""
+        devices = {}
+        for apartment_id, sender_data in self._apartments.items():
+            for device_id, device_info in sender_data.items():
+                # 同一设备出现在多个户型时，以先出现的户型为准
+                if device_id in devices:
+                    continue
+                area_ids = frozenset(
+                    region.get('area-id')
+                    for region in device_info.get('region', [])
+                    if region.get('area-id') is not None
+                )
+                devices[device_id] = DeviceLocation(apartment_id, device_info.get('room_id'), area_ids)
+        self._devices = devices
@@ -0,0 +1,121 @@
+"""Device liveness tracking for airibes."""
+import logging
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class LivenessTracker:
+    """根据设备最后一次上报时间判断在线状态.
+
+    所有设备按最后上报时间排序，定时器只需从最早的设备开始检查，
+    遇到未超时的设备即可停止. 启动时已知但尚未上报的设备先假定在线并立即探测，
+    没有回复时按静默超时判定为离线.
+    """
+
+    def __init__(self, hass: HomeAssistant, on_probe, on_stale, probe_after: float, stale_after: float, interval: float):
+        """初始化在线状态跟踪器.
+
+        Args:
+            on_probe: 设备静默超过 probe_after 秒时调用一次，参数为 device_id
+            on_stale: 设备静默超过 stale_after 秒时调用，参数为 device_id
+            probe_after: 发送探测的静默时间（秒）
+            stale_after: 判定离线的静默时间（秒）
+            interval: 检查间隔（秒）
+        """
+        self.hass = hass
+        self._on_probe = on_probe
+        self._on_stale = on_stale
+        self._probe_after = probe_after
+        self._stale_after = stale_after
+        self._interval = interval
+        self._last_seen = OrderedDict()  # 在线设备 device_id -> 最后上报时间，按时间排序
+        self._probed = set()
+        self._presumed = set()  # 启动时假定在线、尚未确认的设备
+        self._unsub = None
+
+    def async_start(self) -> None:
+        """启动定时检查."""
+        if self._unsub is None:
+            self._unsub = async_track_time_interval(
+                self.hass, self._async_check, timedelta(seconds=self._interval)
+            )
+
+    def async_stop(self) -> None:
+        """停止定时检查."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+
+    def is_online(self, device_id: str) -> bool:
+        """设备是否在线（包括假定在线的设备）."""
+        return device_id in self._last_seen
+
+    def seed(self, device_ids) -> list:
+        """登记已知但尚未上报的设备，视为刚达到探测时间且已发送探测.
+
+        Returns:
+            list: 新登记的设备ID，调用方需要向这些设备发送探测
+        """
+        seen_at = time.monotonic() - self._probe_after
+        seeded = []
+        for device_id in device_ids:
+            if device_id in self._last_seen:
+                continue
+            self._last_seen[device_id] = seen_at
+            # 假定的上报时间早于所有已上报的设备，放在最前面保持排序
+            self._last_seen.move_to_end(device_id, last=False)
+            self._presumed.add(device_id)
+            self._probed.add(device_id)
+            seeded.append(device_id)
+        return seeded
+
+    def last_seen(self, device_id: str):
+        """设备最后上报的单调时间，离线时为 None."""
+        return self._last_seen.get(device_id)
+
+    def touch(self, device_id: str) -> bool:
+        """记录设备上报.
+
+        Returns:
+            bool: 设备是否从离线（或假定在线）变为在线
+        """
+        confirmed = device_id in self._last_seen and device_id not in self._presumed
+        self._last_seen[device_id] = time.monotonic()
+        self._last_seen.move_to_end(device_id)
+        self._probed.discard(device_id)
+        self._presumed.discard(device_id)
+        return not confirmed
+
+    def set_status(self, device_id: str, online: bool) -> bool:
+        """设置设备在线状态.
+
+        Returns:
+            bool: 状态是否发生变化
+        """
+        if online:
+            return self.touch(device_id)
+        self._probed.discard(device_id)
+        self._presumed.discard(device_id)
+        return self._last_seen.pop(device_id, None) is not None
+
+    @callback
+    def _async_check(self, _now=None) -> None:
+        """检查静默设备."""
+        now = time.monotonic()
+        for device_id, last_seen in list(self._last_seen.items()):
+            silence = now - last_seen
+            if silence < self._probe_after:
+                break
+            if silence >= self._stale_after:
+                _LOGGER.debug("设备 %s 已静默 %.0f 秒，判定为离线", device_id, silence)
+                self.set_status(device_id, False)
+                self._on_stale(device_id)
+            elif device_id not in self._probed:
+                self._probed.add(device_id)
+                self._on_probe(device_id)
@@ -1,6 +1,5 @@
 """MQTT client for airibes ."""
 import logging
-import json
 import time
 import asyncio
 from homeassistant.core import HomeAssistant
@@ -12,9 +11,25 @@ from homeassistant.helpers.entity_registry import async_get as async_get_entity_
 from homeassistant.helpers.device_registry import async_get as async_get_device_registry
 from homeassistant.components.binary_sensor import BinarySensorEntity
 from homeassistant.components import persistent_notification
-from .crypto_utils import encrypt_data, decrypt_data
-from .const import DOMAIN, RADAR_CLIFE_PROFILE, STORAGE_VERSION, APARTMENTS_STORAGE_KEY, APARTMENT_DATA_KEY, RADAR_STORAGE_KEY, EVENT_DATA_FORMAT_ERROR
+from .crypto_utils import codec
+from .serializer import loads, dumps, loads_embedded, JSONDecodeError
+from .const import DOMAIN, RADAR_CLIFE_PROFILE, STORAGE_VERSION, APARTMENTS_STORAGE_KEY, APARTMENT_DATA_KEY, RADAR_STORAGE_KEY, EVENT_DATA_FORMAT_ERROR, INGEST_QUEUE_SIZE, INGEST_DROP_POLICY, REQUEST_TIMEOUT, LAYOUT_PUSH_CONCURRENCY, LAYOUT_PUSH_MAX_RETRIES, LAYOUT_PUSH_BACKOFF, DEVICE_PROBE_AFTER, DEVICE_STALE_AFTER, DEVICE_LIVENESS_INTERVAL, POSITION_UPDATE_RATE, POSITION_DEADBAND, TARGET_TTL, SNAPSHOT_MAX_AGE, VIEWER_GRACE_PERIOD, STREAMING_CONCURRENCY, FRAME_CACHE_SIZE, OCCUPANCY_CELL_SIZE, OCCUPANCY_NUMPY_MIN_BATCH, POSITIONS_RADAR_LOCAL, FUSION_GATE, TRAJECTORY_RETENTION_HOURS, TRAJECTORY_FLUSH_INTERVAL
 from .binary_sensor import RoomBinarySensor
+from .layout_index import LayoutIndex
+from .dispatcher import MessageDispatcher
+from .ingest import IngestQueues, IngestFrame, classify_frame
+from .correlation import RequestTracker
+from .push_jobs import LayoutPushManager
+from .outbox import CommandOutbox
+from .liveness import LivenessTracker
+from .positions import PositionAggregator
+from .targets import TargetTable
+from .snapshot import SnapshotCache
+from .viewers import ViewerRegistry
+from .frames import FrameBuilder
+from .occupancy import OccupancyEngine
+from .transforms import TransformTable, apply_transform
+from .trajectories import TrajectoryLog
 from homeassistant.helpers.storage import Store
 import pickle
 
@@ -28,14 +43,62 @@ class MqttClient:
         self.hass = hass
         self.base_topic = "/device/05F6165E01290101"
         self.sender_msgId = 1
+        self._frames = FrameBuilder(FRAME_CACHE_SIZE)
         self._status_task = None
         self._subscribe_task = None
         self._is_subscribed = False
-        self._is_frontend_visible = False
+        self.layout_index = LayoutIndex(hass)
+        self._sent_common_doors = {}  # device_id -> (户型版本, 已发送的共用门ID)
+        self._sync_tasks = {}  # device_id -> 进行中的户型同步任务
+        self._cmd_dispatcher = MessageDispatcher("cmd")
+        self._param_dispatcher = MessageDispatcher("params")
+        self._ingest = IngestQueues(self._process_frame, INGEST_QUEUE_SIZE, INGEST_DROP_POLICY)
+        self._requests = RequestTracker()
+        self._outbox = CommandOutbox()
+        self._liveness = LivenessTracker(
+            hass,
+            self._on_device_probe,
+            self._on_device_stale,
+            DEVICE_PROBE_AFTER,
+            DEVICE_STALE_AFTER,
+            DEVICE_LIVENESS_INTERVAL,
+        )
+        self.positions = PositionAggregator(
+            hass, self.layout_index, POSITION_UPDATE_RATE, POSITION_DEADBAND, FUSION_GATE
+        )
+        self._targets = TargetTable(hass, self._on_targets_expired, TARGET_TTL)
+        self._snapshot = SnapshotCache()
+        self.viewers = ViewerRegistry(
+            hass, self._on_apartment_watched, self._on_apartment_unwatched, VIEWER_GRACE_PERIOD
+        )
+        self._streaming_semaphore = asyncio.Semaphore(STREAMING_CONCURRENCY)
+        self.occupancy = OccupancyEngine(hass, OCCUPANCY_CELL_SIZE, OCCUPANCY_NUMPY_MIN_BATCH)
+        self._transforms = TransformTable(POSITIONS_RADAR_LOCAL)
+        self.layout_index.add_listener(self._on_layout_changed)
+        self.positions.async_subscribe_all(self._on_apartment_positions)
+        self._trajectories = TrajectoryLog(
+            hass,
+            hass.config.path('airibes_storage', 'trajectories'),
+            TRAJECTORY_RETENTION_HOURS,
+            TRAJECTORY_FLUSH_INTERVAL,
+        )
+        self.positions.async_subscribe_all(self._trajectories.record)
+        self.push_jobs = LayoutPushManager(hass, self.send_single_device_apartment_data, LAYOUT_PUSH_CONCURRENCY)
 
     async def async_setup(self):
         """设置 MQTT 订阅."""
         try:
+            # 注册消息处理器
+            self._register_handlers()
+
+            # 加载设备布局索引
+            await self.layout_index.async_rebuild()
+
+            # 启动设备在线检测
+            self._liveness.async_start()
+            self._targets.async_start()
+            self._trajectories.async_start()
+
             if not self.hass.data.get("mqtt"):
                 return False
 
@@ -60,10 +123,12 @@ class MqttClient:
                             self.hass,
                             upward_topic,
                             self._message_received,
-                            qos=0
+                            qos=0,
+                            encoding=None  # 保留原始 bytes，由 serializer 直接解析
                         )
                         self._is_subscribed = True
                         _LOGGER.debug("MQTT 订阅成功")
+                        await self._async_probe_known_devices()
                     except Exception as e:
                         self._is_subscribed = False
 
@@ -84,6 +149,15 @@ class MqttClient:
 
     async def async_stop(self):
         """停止 MQTT 客户端."""
+        self._liveness.async_stop()
+        self._targets.async_stop()
+        self.viewers.async_stop()
+        self.positions.async_stop()
+        for task in list(self._sync_tasks.values()):
+            task.cancel()
+        await self._trajectories.async_stop()
+        await self._ingest.async_stop()
+
         if self._status_task:
             self._status_task.cancel()
             try:
@@ -115,43 +189,136 @@ class MqttClient:
             device_id = topic_parts[3]  # 获取通配符位置的值
             
             try:
-                # 尝试解析 payload 为 JSON
-                if isinstance(payload, bytes):
-                    payload_str = payload.decode('utf-8')
-                else:
-                    payload_str = payload
-
-                payload_data = json.loads(payload_str)
+                # 直接从 bytes 解析 payload
+                payload_data = loads(payload)
                 _LOGGER.debug("收到 MQTT 消息: Payload=%s", payload_data)
 
-                # 获取 cmd 字段
-                if 'cmd' in payload_data:
-                    cmd = payload_data['cmd']
-                    # 处理不同的 cmd
-                    if cmd == 2004:
-                        # 处理 cmd 2004 消息
-                        await self._handle_cmd_2004(device_id, payload_data)
-                    elif cmd == 2006:
-                        # 处理 cmd 2006 消息
-                        await self._handle_cmd_2006(device_id, payload_data)
-                    elif cmd == 2012:
-                        # 处理 cmd 2012 消息
-                        await self._handle_cmd_2012(device_id, payload_data)
-                    elif cmd == 2014:
-                        # 处理 cmd 2014 消息
-                        await self._handle_cmd_2014(device_id, payload_data)
-                else:
-                    _LOGGER.debug("消息中缺少 cmd 字段: %s", payload_str)
-            except json.JSONDecodeError as e:
+                # 预先解密 cmd 2006 的数据，用于判断帧类型
+                params = None
+                if payload_data.get('cmd') == 2006:
+                    params = self._decode_params(payload_data)
+                    payload_data['params'] = params
+            except JSONDecodeError as e:
                 _LOGGER.debug("JSON 解析失败: %s, Payload: %s", str(e), payload)
+                return
             except Exception as e:
                 _LOGGER.debug("处理消息时出错: %s", str(e))
+                return
+
+            # 获取 cmd 字段
+            if 'cmd' in payload_data:
+                # 放入设备接收队列，由工作任务按顺序处理
+                cmd = payload_data['cmd']
+                self._ingest.put(device_id, IngestFrame(cmd, payload_data, classify_frame(cmd, params)))
+            else:
+                _LOGGER.debug("消息中缺少 cmd 字段: %s", payload)
         else:
             _LOGGER.debug("无效的主题格式: %s", topic)
 
-    def set_apartment_view_visible(self, apartment_id: int, visible: bool):
-        """设置户型视图可见性."""
-        self._is_frontend_visible = visible
+    async def _process_frame(self, device_id: str, frame: IngestFrame):
+        """处理接收队列中的帧."""
+        # 除遗嘱和解绑消息外，收到任何消息都表明设备在线
+        if frame.cmd not in (2012, 2014) and self._liveness.touch(device_id):
+            await self._handle_device_status(device_id, 1)
+        await self._cmd_dispatcher.async_dispatch(frame.cmd, device_id, frame.payload)
+
+    async def _async_probe_known_devices(self) -> None:
+        """登记存储中的所有雷达并发送状态查询，使在线检测覆盖启动后尚未上报的设备."""
+        radar_store = Store(self.hass, STORAGE_VERSION, RADAR_STORAGE_KEY)
+        stored_devices = await radar_store.async_load() or {}
+        seeded = self._liveness.seed(stored_devices)
+        if seeded:
+            _LOGGER.debug("探测已知设备的在线状态: %s", seeded)
+            await asyncio.gather(*(self._sender_for_status_cmd(device_id, [6]) for device_id in seeded))
+
+    def _on_device_probe(self, device_id: str) -> None:
+        """设备静默一段时间后查询其状态."""
+        self.hass.async_create_task(self._sender_for_status_cmd(device_id, [6]))
+
+    def _on_device_stale(self, device_id: str) -> None:
+        """设备静默超时，判定为离线."""
+        self.hass.async_create_task(self._handle_device_offline(device_id))
+
+    @staticmethod
+    def _decode_params(payload: dict):
+        """解密 cmd 2006 数据并返回 params 列表."""
+        encrypted_data = payload.get('data')
+        if not encrypted_data:
+            return None
+
+        # 解密数据，明文字节直接解析
+        decrypted_data = codec.decrypt_bytes(encrypted_data)
+        data_json = loads(decrypted_data)
+
+        if 'params' not in data_json:
+            _LOGGER.warning("解密数据中没有 params 字段: %s", decrypted_data)
+            return None
+        return data_json['params']
+
+    def _on_apartment_watched(self, apartment_id: int) -> None:
+        """户型开始被查看，开启户型中雷达的人员位置推送."""
+        self.hass.async_create_task(self.async_set_apartment_streaming(apartment_id, True))
+
+    def _on_apartment_unwatched(self, apartment_id: int) -> None:
+        """户型不再被查看，停止户型中雷达的人员位置推送."""
+        # 雷达停止推送后人员位置不再可信
+        self.occupancy.reset(apartment_id)
+        self.hass.async_create_task(self.async_set_apartment_streaming(apartment_id, False))
+
+    def _on_layout_changed(self, apartment_ids: list) -> None:
+        """户型布局变化后重新计算设备坐标变换和占用计算的空间网格."""
+        for apartment_id in apartment_ids:
+            sender_data = self.layout_index.get_sender_data(apartment_id)
+            self._transforms.rebuild(apartment_id, sender_data)
+            self.occupancy.rebuild(apartment_id, sender_data)
+
+    def _on_apartment_positions(self, apartment_id: int, frame: dict) -> None:
+        """根据户型的人员位置更新房间和区域的占用状态."""
+        # 只有雷达推送位置时才能判断无人
+        if self.viewers.is_watched(apartment_id):
+            self.occupancy.update(apartment_id, frame)
+
+    async def async_get_trajectories(self, apartment_id: int, start: float, end: float, downsample: float = 0) -> list:
+        """查询户型在时间范围内的人员轨迹."""
+        return await self._trajectories.async_query(apartment_id, start, end, downsample)
+
+    def is_streaming_wanted(self, device_id: str) -> bool:
+        """雷达所在户型是否有人查看."""
+        location = self.layout_index.get(device_id)
+        return location is not None and self.viewers.is_watched(location.apartment_id)
+
+    async def async_set_apartment_streaming(self, apartment_id: int, streaming: bool) -> None:
+        """开启或停止户型中雷达的人员位置推送."""
+        device_ids = [
+            device_id for device_id in self.layout_index.get_sender_data(apartment_id)
+            # 设备同时属于其他被查看的户型时不停止
+            if streaming or not self.is_streaming_wanted(device_id)
+        ]
+        await self._async_set_devices_streaming(device_ids, streaming)
+
+    async def async_reconcile_streaming(self) -> None:
+        """停止所有无人查看的雷达的人员位置推送（例如重启后）."""
+        radar_store = Store(self.hass, STORAGE_VERSION, RADAR_STORAGE_KEY)
+        stored_devices = await radar_store.async_load() or {}
+        device_ids = [
+            device_id for device_id in stored_devices
+            if not self.is_streaming_wanted(device_id)
+        ]
+        await self._async_set_devices_streaming(device_ids, False)
+
+    async def _async_set_devices_streaming(self, device_ids: list, streaming: bool) -> None:
+        """并发发送开启或停止命令，跳过 key 13 状态已一致的设备."""
+        expected = 1 if streaming else 0
+        send = self.send_start_cmd if streaming else self.send_stop_cmd
+
+        async def set_streaming(device_id: str) -> None:
+            async with self._streaming_semaphore:
+                await send(device_id)
+
+        await asyncio.gather(*(
+            set_streaming(device_id) for device_id in device_ids
+            if self._snapshot.get(device_id).get("streaming") != expected
+        ))
 
     async def _get_radar_sensor(self, entity_id: str):
         """获取雷达传感实体."""
@@ -214,7 +381,7 @@ class MqttClient:
                 # 注册雷达设备
                 if await self._register_radar_device(device_id):
                     # 入网应答数据
-                    await self._async_data_publish(device_id, 2005, 2, msg_id, RADAR_CLIFE_PROFILE)
+                    await self._async_data_publish(device_id, 2005, 2, msg_id, RADAR_CLIFE_PROFILE, "profile")
                 else:
                     # 注册失败，显示通知
                     await self.hass.async_create_task(
@@ -268,257 +435,287 @@ class MqttClient:
                     "status": value == 1
                 }
             )
+
+            # 设备上线后发送离线期间缓存的指令
+            if value == 1:
+                await self._flush_outbox(device_id)
             
         except Exception as e:
             _LOGGER.error("处理设备状态数据失败: %s", str(e))
 
+    def get_device_snapshot(self, device_id: str) -> dict:
+        """获取设备最近已知的状态."""
+        snapshot = self._snapshot.get(device_id)
+        snapshot["online"] = self._liveness.is_online(device_id)
+        snapshot["positions"] = self._targets.get(device_id)
+        return snapshot
+
+    def get_apartment_snapshot(self, apartment_id: int) -> dict:
+        """获取户型中所有雷达最近已知的状态."""
+        return {
+            device_id: self.get_device_snapshot(device_id)
+            for device_id in self.layout_index.get_sender_data(apartment_id)
+        }
+
+    def is_device_online(self, device_id: str) -> bool:
+        """设备是否在线."""
+        return self._liveness.is_online(device_id)
+
+    async def _flush_outbox(self, device_id: str) -> None:
+        """将离线期间缓存的指令合并为一帧发送."""
+        params = self._outbox.pop(device_id)
+        if params:
+            _LOGGER.debug("设备 %s 上线，发送缓存的指令: %s", device_id, [list(param)[0] for param in params])
+            await self._sender_profile_data(device_id, {"params": params}, queue_offline=False)
+
     async def _handle_cmd_2006(self, device_id: str, payload: dict):
         """处理 cmd 2006 的消息."""
-         # 获取设备实体ID
-        entity_id = f"sensor.airibes_radar_{device_id.lower()}"
-        
-        # 获取设备当前状态
-        entity_state = self.hass.states.get(entity_id)
-        if entity_state is None or entity_state.state != "在线":
-            # 设备离线时才更新状态
-            await self._handle_device_status(device_id, 1)
-        
+        params = payload['params'] if 'params' in payload else self._decode_params(payload)
+        if not params:
+            return
+
+        dispatch = self._param_dispatcher.async_dispatch
+        for param in params:
+            for key, value in param.items():
+                self._snapshot.update(device_id, key, value)
+                await dispatch(key, device_id, value)
+
+    def register_param_handler(self, key: str, handler) -> None:
+        """注册 cmd 2006 params 中指定 key 的处理器.
+
+        Args:
+            key: params 中的 key，例如 '11'
+            handler: 异步处理函数，参数为 (device_id, value)
+        """
+        self._param_dispatcher.register(key, handler)
+
+    def get_dispatch_stats(self) -> dict:
+        """获取消息分发统计数据."""
+        return {
+            "cmd": self._cmd_dispatcher.get_stats(),
+            "params": self._param_dispatcher.get_stats(),
+            "ingest": self._ingest.get_stats(),
+            "requests": self._requests.get_stats(),
+        }
+
+    def reset_dispatch_stats(self) -> None:
+        """清空 get_dispatch_stats 返回的所有统计数据."""
+        self._cmd_dispatcher.reset_stats()
+        self._param_dispatcher.reset_stats()
+        self._ingest.reset_stats()
+        self._requests.reset_stats()
+
+    def _register_handlers(self) -> None:
+        """注册 cmd 和 params key 的处理器."""
+        self._cmd_dispatcher.register(2004, self._handle_cmd_2004)
+        self._cmd_dispatcher.register(2006, self._handle_cmd_2006)
+        self._cmd_dispatcher.register(2012, self._handle_cmd_2012)
+        self._cmd_dispatcher.register(2014, self._handle_cmd_2014)
+
+        self._param_dispatcher.set_fallback(self._handle_unknown_param)
+        param_handlers = {
+            '6': self._handle_param_status,
+            '7': self._handle_param_version,
+            '8': self._handle_param_level,
+            '9': self._make_log_handler("设备工作模式"),
+            '10': self._make_log_handler("设备报警状态"),
+            '11': self._make_log_handler("设备监测人数数量"),
+            '12': self._make_log_handler("设备电池电量"),
+            '13': self._handle_param_report_switch,
+            '14': self._make_log_handler("设备温度"),
+            '15': self._make_log_handler("设备湿度"),
+            '16': self._handle_param_ap,
+            '17': self._handle_param_event,
+            '18': self._make_log_handler("设备IP地址"),
+            '19': self._handle_param_room_status,
+            '70': self._handle_param_learn,
+            '73': self._handle_param_method_reply,
+            '74': self._handle_param_apartment_version,
+            '76': self._handle_param_full_positions,
+            '78': self._handle_param_delta_positions,
+        }
+        for key, handler in param_handlers.items():
+            self._param_dispatcher.register(key, handler)
+
+    @staticmethod
+    def _make_log_handler(description: str):
+        """创建仅记录日志的处理器."""
+        async def handler(device_id: str, value):
+            _LOGGER.info("%s: device_id=%s, value=%s", description, device_id, value)
+        return handler
+
+    async def _handle_unknown_param(self, key: str, device_id: str, value):
+        """处理未注册的 key."""
+        _LOGGER.info("未知 Key %s 数据: %s", key, value)
+
+    async def _handle_param_apartment_version(self, device_id: str, value):
+        """处理户型数据版本（key 74）."""
+        # 有等待中的户型数据请求时，作为请求的回复处理
+        if not self._requests.resolve(device_id, '74', value):
+            # 设备主动推送的数据，处理同步；正在推送时等待推送结果
+            if not isinstance(value, str) or "HASS_" not in value or self._requests.has_pending(device_id, '74'):
+                return
+            self._schedule_apartment_sync(device_id, value)
+        # 发送共同出入口id数据
+        version = value if isinstance(value, str) and "HASS_" in value else None
+        await self.send_common_door_id_to_device(device_id, version)
+
+    async def _handle_param_full_positions(self, device_id: str, value):
+        """处理全量人员位置数据（key 76）."""
+        await self._handle_positions(device_id, '76', value)
+
+    async def _handle_param_delta_positions(self, device_id: str, value):
+        """处理增量人员位置数据（key 78）."""
+        await self._handle_positions(device_id, '78', value)
+
+    async def _handle_positions(self, device_id: str, key: str, value):
+        """处理人员位置数据."""
         try:
-            encrypted_data = payload.get('data')
-            if encrypted_data:
-                # 解密数据
-                decrypted_data = decrypt_data(encrypted_data)
-                if isinstance(decrypted_data, str):
-                    data_json = json.loads(decrypted_data)
-                else:
-                    data_json = decrypted_data
-                    
-                if 'params' in data_json:
-                    for param in data_json['params']:
-                        for key, value in param.items():
-                            if key == '74':
-                                # 只有在等待响应（有回调函数）才处理响应
-                                if hasattr(self, '_response_callbacks') and device_id in self._response_callbacks:
-                                    callback = self._response_callbacks[device_id]
-                                    # 直接传递原始响应数据
-                                    callback({
-                                        'cmd': 2006,
-                                        'key': 74,
-                                        'value': value
-                                    })
-                                else:
-                                    # 设备主动推送的数据，处理同步
-                                    if not isinstance(value, str) or "HASS_" not in value:
-                                        continue
-                                    await self.sync_apartment_data(device_id, value)
-                                # 发送共同出入口id数据
-                                await self.send_common_door_id_to_device(device_id)
-                            elif key == '76' or key == '78':
-                                try:
-                                    # 处理转义的 JSON 字符串
-                                    value = value.replace('\\"', '"')  # 替换转义的双引号
-                                    positions = json.loads(value)
-                                    
-                                    # 获取当前设备的所有位置数据
-                                    if not hasattr(self, '_person_positions'):
-                                        self._person_positions = {}
-                                    if device_id not in self._person_positions:
-                                        self._person_positions[device_id] = []
-                                    
-                                    # 如果是key 76且收到空列表，直接清空并更新
-                                    if key == '76' and not positions:
-                                        self._person_positions[device_id] = []
-                                    else:
-                                        # 如果是key 76，先清空现数据
-                                        if key == '76':
-                                            self._person_positions[device_id] = []
-                                        
-                                        # 转换坐标（米转换为厘米）并添加到列表中
-                                        for pos in positions:
-                                            converted_pos = {
-                                                "id": pos["id"],
-                                                "x": pos["x"] * 100,  # 米转厘米
-                                                "y": pos["y"] * 100   # 米转厘米
-                                            }
-                                            # 更新或添加位置数据
-                                            existing_pos = next(
-                                                (p for p in self._person_positions[device_id] if p["id"] == pos["id"]), 
-                                                None
-                                            )
-                                            if existing_pos:
-                                                existing_pos.update(converted_pos)
-                                            else:
-                                                self._person_positions[device_id].append(converted_pos)
-                                    
-                                    # 发送事件通知前端更新
-                                    self.hass.bus.async_fire(
-                                        f"{DOMAIN}_person_positions_update",
-                                        {
-                                            "device_id": device_id,
-                                            "positions": self._person_positions[device_id]
-                                        }
-                                    )
-                                    
-                                    # 更新设备的人员位置属性
-                                    entity_id = f"sensor.{DOMAIN}_radar_{device_id}"
-                                    state = self.hass.states.get(entity_id)
-                                    if state:
-                                        new_attributes = dict(state.attributes)
-                                        new_attributes["person_positions"] = self._person_positions[device_id]
-                                        self.hass.states.async_set(
-                                            entity_id,
-                                            state.state,
-                                            new_attributes
-                                        )
-                                    
-                                except json.JSONDecodeError as e:
-                                    _LOGGER.error("解析人员位置数据失败: %s, 原始数据: %s", str(e), value)
-                                except Exception as e:
-                                    _LOGGER.error("处理人员位置数据失败: %s", str(e))
-                            
-                            elif key == '6':
-                                # 设备状态（在线/离线）处理方法
-                                await self._handle_device_status(device_id, value)
-                            elif key == '7':
-                                # 处理设备本信息
-                                pass
-                                
-                            elif key == '8':
-                                # 更新灵敏度选择实体
-                                select_entity_id = f"select.{DOMAIN}_radar_{device_id}_level"
-                                
-                                # 获取选择实体对象
-                                select = self.hass.data[DOMAIN].get("selects", {}).get(device_id)
-                                if select:
-                                    # 将数值转换为对应的选项
-                                    level_map = {0: "低", 1: "中", 2: "高"}
-                                    new_option = level_map.get(value)
-                                    
-                                    if new_option and new_option != select.current_option:
-                                        await select.async_select_option(new_option)
-                                        
-                            elif key == '9':
-                                # 处理设备工作模式
-                                _LOGGER.info("设备工作模式: device_id=%s, value=%s", device_id, value)
-                                
-                            elif key == '10':
-                                # 处理设报警状态
-                                _LOGGER.info("设备报警状态: device_id=%s, value=%s", device_id, value)
-                                
-                            elif key == '11':
-                                # 处理设备监测人数数量
-                                _LOGGER.info("设备监测人数数量: device_id=%s, value=%s", device_id, value)
-                                
-                            elif key == '12':
-                                # 处理设备电池电量
-                                _LOGGER.info("设备电池电量: device_id=%s, value=%s", device_id, value)
-                                
-                            elif key == '13':
-                                # 处理设备上报开关状态
-                                if self._is_frontend_visible and value == 0:
-                                    await self.send_start_cmd(device_id)
-                                
-                            elif key == '14':
-                                # 处理设备温度
-                                _LOGGER.info("设备温度: device_id=%s, value=%s", device_id, value)
-
-                            elif key == '15':
-                                # 处理设备湿度
-                                _LOGGER.info("设备湿度: device_id=%s, value=%s", device_id, value)
-
-                            elif key == '16':
-                                # 更新 AP 开关状态
-                                switch_entity_id = f"switch.{DOMAIN}_radar_{device_id}_ap"
-                                # 获取开关实体对象
-                                switch = self.hass.data[DOMAIN].get("switches", {}).get(device_id)
-                                if switch:
-                                    current_state = switch.is_on
-                                    new_state = bool(value == 1)
-                                    # 只有当状态需要改变时才调用相应方法
-                                    if current_state != new_state:
-                                        # 直接更新开关状态，而不是调用 turn_on/off 方法
-                                        switch._is_on = new_state
-                                        # 通知 Home Assistant 状态已更新
-                                        switch.async_write_ha_state()
-                                        
-                            elif key == '17':
-                                _LOGGER.info('mqtt -- 事件数据状态: %s', value)
-                                try:
-                                    value_dict = json.loads(value) if isinstance(value, str) else value
-                                    if value_dict.get('siid') == 13 and value_dict.get('eiid') == 1:
-                                        args = value_dict.get('arg', [])
-                                        # 每两个元素为一组处理
-                                        index = 0
-                                        for i in range(0, len(args), 2):
-                                            if i + 1 < len(args):
-                                                index += 1
-                                                area_id = args[i].get(str(index))
-                                                has_person = args[i + 1].get(str(index + 10))
-                                                if area_id is not None and has_person is not None:
-                                                    await self.update_area_status(device_id, area_id, has_person == 1)
-                                    elif value_dict.get('siid') == 13 and value_dict.get('eiid') == 3:
-                                        _LOGGER.info('mqtt -- 出入口移动事件状态: %s', value_dict)
-                                        args = value_dict.get('arg', [])
-                                        if len(args) == 4:  # 确保有四个元素
-                                            area_id = args[0].get('1')
-                                            direction = args[1].get('21')
-                                            frames = args[2].get('26')
-                                            number = args[3].get('27')
-                                            if all(v is not None for v in [area_id, direction, frames, number]):
-                                                await self.notify_area_movement(device_id, area_id, direction, frames, number)
-                                        else:
-                                            _LOGGER.warning('mqtt -- 出入口移动事件参数不完整: %s', args)
-                                except Exception as e:
-                                    _LOGGER.error(f"处理区域状态数据失败: {str(e)}")
-                            elif key == '18':
-                                # 处理设备IP地址
-                                _LOGGER.info("设备IP地址: device_id=%s, value=%s", device_id, value)
-                                
-                            elif key == '19':
-                                _LOGGER.info('mqtt -- 整屋有无人状态改变')
-                                # 更新房间状态
-                                await self.update_room_status(device_id, value)
-                            elif key == '70':
-                                # 更新自学习开关状态
-                                _LOGGER.info("自学习开关状态: device_id=%s, value=%s", device_id, value)
-                                switch_entity_id = f"switch.{DOMAIN}_radar_{device_id}_learn"
-                                # 获取开关实体对象
-                                switch = self.hass.data[DOMAIN].get("switches", {}).get(f"{device_id}_learn")
-                                if switch:
-                                    current_state = switch.is_on
-                                    new_state = bool(value == 1)
-                                    # 只有当状态需要改变时才调用相应方法
-                                    if current_state != new_state:
-                                        if new_state:
-                                            await switch.async_turn_on()
-                                        else:
-                                            await switch.async_turn_off()
-                                        _LOGGER.info("更新自学习开关状态: %s -> %s", switch_entity_id, "on" if new_state else "off")
-                            elif key == '73':
-                                # 方法回复数据
-                                _LOGGER.info("方法回复数据: %s", value)
-                                # 方法回复数据: {"msgId":77,"siid":12,"aiid":1,"code":0,"out":[{"6":false}]}
-                                value_dict = json.loads(value) if isinstance(value, str) else value
-                                _LOGGER.info("校验 -- 方法回复数据0000: %s", value_dict)
-                                if value_dict.get('siid') == 12 and value_dict.get('aiid') == 1:
-                                    if value_dict.get('out') and value_dict.get('out')[0].get('6') is not None:
-                                        #校验结果
-                                        calibration_result = value_dict.get('out')[0].get('6')
-                                        _LOGGER.info("方法回复数据--校验结果: %s", calibration_result)
-                                        # 发送状态更新事件，用于前端更新
-                                        self.hass.bus.async_fire(
-                                            f"{DOMAIN}_device_calibration_result",
-                                            {
-                                                "device_id": device_id,
-                                                "result": calibration_result
-                                            }
-                                        )   
-                            else:
-                                _LOGGER.info("未知 Key %s 数据: %s", key, value)
-                else:
-                    _LOGGER.warning("解密数据中没有 params 字段: %s", decrypted_data)
+            # 处理转义的 JSON 字符串
+            positions = loads_embedded(value)
+
+            # 按设备预先计算的变换批量转换为户型坐标（厘米）
+            targets = apply_transform(self._transforms.get(device_id), positions)
+            if key == '76':
+                # key 76 为完整的目标列表
+                self._targets.replace(device_id, targets)
+            else:
+                self._targets.update(device_id, targets)
+
+            # 合并后按固定频率通知前端更新，人员位置不写入雷达传感器状态
+            self.positions.update(device_id, self._targets.get(device_id))
+
+        except JSONDecodeError as e:
+            _LOGGER.error("解析人员位置数据失败: %s, 原始数据: %s", str(e), value)
         except Exception as e:
-            _LOGGER.error("处理 cmd 2006 数据失败: %s", str(e))
+            _LOGGER.error("处理人员位置数据失败: %s", str(e))
+
+    def _on_targets_expired(self, device_id: str) -> None:
+        """设备有目标过期后更新人员位置."""
+        self.positions.update(device_id, self._targets.get(device_id))
+
+
+
+    async def _handle_param_status(self, device_id: str, value):
+        """处理设备状态（key 6）."""
+        # 设备状态（在线/离线）处理方法，只在状态变化时更新
+        if self._liveness.set_status(device_id, value == 1):
+            if value == 1:
+                await self._handle_device_status(device_id, value)
+            else:
+                # 离线时与 cmd 2014 一样清空人员目标和缓存状态
+                await self._handle_device_offline(device_id)
+
+    async def _handle_param_version(self, device_id: str, value):
+        """处理设备版本信息（key 7）."""
+        pass
+
+    async def _handle_param_level(self, device_id: str, value):
+        """处理灵敏度（key 8）."""
+        # 获取选择实体对象
+        select = self.hass.data[DOMAIN].get("selects", {}).get(device_id)
+        if select:
+            # 将数值转换为对应的选项
+            level_map = {0: "低", 1: "中", 2: "高"}
+            new_option = level_map.get(value)
+            
+            if new_option and new_option != select.current_option:
+                await select.async_select_option(new_option)
+
+    async def _handle_param_report_switch(self, device_id: str, value):
+        """处理设备上报开关状态（key 13）."""
+        # 推送状态与是否有人查看不一致时纠正
+        wanted = self.is_streaming_wanted(device_id)
+        if wanted and value == 0:
+            await self.send_start_cmd(device_id)
+        elif not wanted and value == 1:
+            await self.send_stop_cmd(device_id)
+
+    async def _handle_param_ap(self, device_id: str, value):
+        """处理 AP 开关状态（key 16）."""
+        # 获取开关实体对象
+        switch = self.hass.data[DOMAIN].get("switches", {}).get(device_id)
+        if switch:
+            current_state = switch.is_on
+            new_state = bool(value == 1)
+            # 只有当状态需要改变时才调用相应方法
+            if current_state != new_state:
+                # 直接更新开关状态，而不是调用 turn_on/off 方法
+                switch._is_on = new_state
+                # 通知 Home Assistant 状态已更新
+                switch.async_write_ha_state()
+
+    async def _handle_param_event(self, device_id: str, value):
+        """处理事件数据（key 17）."""
+        _LOGGER.info('mqtt -- 事件数据状态: %s', value)
+        value_dict = loads(value) if isinstance(value, str) else value
+        if value_dict.get('siid') == 13 and value_dict.get('eiid') == 1:
+            args = value_dict.get('arg', [])
+            # 每两个元素为一组处理
+            index = 0
+            for i in range(0, len(args), 2):
+                if i + 1 < len(args):
+                    index += 1
+                    area_id = args[i].get(str(index))
+                    has_person = args[i + 1].get(str(index + 10))
+                    if area_id is not None and has_person is not None:
+                        await self.update_area_status(device_id, area_id, has_person == 1)
+        elif value_dict.get('siid') == 13 and value_dict.get('eiid') == 3:
+            _LOGGER.info('mqtt -- 出入口移动事件状态: %s', value_dict)
+            args = value_dict.get('arg', [])
+            if len(args) == 4:  # 确保有四个元素
+                area_id = args[0].get('1')
+                direction = args[1].get('21')
+                frames = args[2].get('26')
+                number = args[3].get('27')
+                if all(v is not None for v in [area_id, direction, frames, number]):
+                    await self.notify_area_movement(device_id, area_id, direction, frames, number)
+            else:
+                _LOGGER.warning('mqtt -- 出入口移动事件参数不完整: %s', args)
+
+    async def _handle_param_room_status(self, device_id: str, value):
+        """处理整屋有无人状态（key 19）."""
+        _LOGGER.info('mqtt -- 整屋有无人状态改变')
+        # 更新房间状态
+        await self.update_room_status(device_id, value)
+
+    async def _handle_param_learn(self, device_id: str, value):
+        """处理自学习开关状态（key 70）."""
+        _LOGGER.info("自学习开关状态: device_id=%s, value=%s", device_id, value)
+        switch_entity_id = f"switch.{DOMAIN}_radar_{device_id}_learn"
+        # 获取开关实体对象
+        switch = self.hass.data[DOMAIN].get("switches", {}).get(f"{device_id}_learn")
+        if switch:
+            current_state = switch.is_on
+            new_state = bool(value == 1)
+            # 只有当状态需要改变时才调用相应方法
+            if current_state != new_state:
+                if new_state:
+                    await switch.async_turn_on()
+                else:
+                    await switch.async_turn_off()
+                _LOGGER.info("更新自学习开关状态: %s -> %s", switch_entity_id, "on" if new_state else "off")
+
+    async def _handle_param_method_reply(self, device_id: str, value):
+        """处理方法回复数据（key 73）."""
+        _LOGGER.info("方法回复数据: %s", value)
+        # 方法回复数据: {"msgId":77,"siid":12,"aiid":1,"code":0,"out":[{"6":false}]}
+        value_dict = loads(value) if isinstance(value, str) else value
+        # 完成等待中的方法调用
+        self._requests.resolve(device_id, '73', value_dict, value_dict.get('msgId'))
+        if value_dict.get('siid') == 12 and value_dict.get('aiid') == 1:
+            if value_dict.get('out') and value_dict.get('out')[0].get('6') is not None:
+                #校验结果
+                calibration_result = value_dict.get('out')[0].get('6')
+                _LOGGER.info("方法回复数据--校验结果: %s", calibration_result)
+                # 发送状态更新事件，用于前端更新
+                self.hass.bus.async_fire(
+                    f"{DOMAIN}_device_calibration_result",
+                    {
+                        "device_id": device_id,
+                        "result": calibration_result
+                    }
+                )
 
     async def _handle_cmd_2012(self, device_id: str, payload: dict):
         """处理 cmd 2012 的消息."""
@@ -602,6 +799,7 @@ class MqttClient:
 
                 # 删除户型数据中的设备
                 await self.delete_apart_device(device_id)
+                self._outbox.discard(device_id)
 
                 # 5. 强制刷新实体注册表
                 # await entity_registry.async_load()
@@ -625,15 +823,18 @@ class MqttClient:
     async def _handle_cmd_2014(self, device_id: str, payload: dict):
         """处理 cmd 2014 的消息."""
         # 收到遗嘱表明设备状态已离线
+        if self._liveness.set_status(device_id, False):
+            await self._handle_device_offline(device_id)
+
+    async def _handle_device_offline(self, device_id: str):
+        """处理设备离线."""
         await self._handle_device_status(device_id, 0)
+        # 设备重新上线后需要重新下发共用门
+        self._sent_common_doors.pop(device_id, None)
         # 清空此设备的人员位置数据
-        self.hass.bus.async_fire(
-            f"{DOMAIN}_person_positions_update",
-            {
-                "device_id": device_id,
-                "positions": []
-            }
-        )
+        self._targets.clear(device_id)
+        self._snapshot.remove(device_id)
+        self.positions.clear(device_id)
 
     # 发送获取全部状态数据 （所有设备）
     async def _sender_for_all_status_cmd(self, device_id: str):
@@ -644,17 +845,66 @@ class MqttClient:
         await self._async_data_publish(device_id, 2009, 2, self.sender_msgId, {"params": status})
 
     #发送属性数据
-    async def _sender_profile_data(self, device_id: str, data: dict):
+    async def _sender_profile_data(self, device_id: str, data: dict, queue_offline: bool = True) -> int:
+        # 设备离线时缓存指令，等设备上线后合并发送
+        if queue_offline and data.get("params") and not self.is_device_online(device_id):
+            self._outbox.put(device_id, data["params"])
+            return None
         self.sender_msgId += 1  # 递增消息ID
-        await self._async_data_publish(device_id, 2011, 1, self.sender_msgId, data)
+        msg_id = self.sender_msgId
+        await self._async_data_publish(device_id, 2011, 1, msg_id, data)
+        return msg_id
 
-    #发送方法数据
-    async def _sender_method_data(self, device_id: str, data: dict):
-        cmdData = {"params": [{"72": json.dumps(data, separators=(',', ':'))}]}
+    #发送方法数据，每次调用分配唯一的方法 msgId，设备在方法回复（key 73）中原样返回
+    async def _sender_method_data(self, device_id: str, data: dict, method_msg_id: int = None) -> int:
+        if method_msg_id is None:
+            self.sender_msgId += 1
+            method_msg_id = self.sender_msgId
+        cmdData = {"params": [{"72": dumps({**data, "msgId": method_msg_id})}]}
         self.sender_msgId += 1  # 递增消息ID
         await self._async_data_publish(device_id, 2011, 1, self.sender_msgId, cmdData)
+        return method_msg_id
+
+    async def async_request_properties(self, device_id: str, data: dict, reply_key: str, timeout: float = REQUEST_TIMEOUT, expected=None):
+        """发送属性数据并等待设备在指定 key 上的回复.
+
+        同一设备可以同时有多个进行中的请求，回复按发送顺序匹配.
+
+        Args:
+            device_id: 设备ID
+            data: 属性数据
+            reply_key: 期望回复所在的 params key
+            timeout: 超时时间（秒）
+            expected: 可接受的回复值，其他值视为设备主动上报
+
+        Returns:
+            回复的值，超时抛出 asyncio.TimeoutError
+        """
+        request = self._requests.register(device_id, reply_key, expected=expected)
+        await self._sender_profile_data(device_id, data, queue_offline=False)
+        return await self._requests.async_wait(request, timeout)
+
+    async def async_call_method(self, device_id: str, data: dict, timeout: float = REQUEST_TIMEOUT) -> dict:
+        """调用设备方法并等待方法回复（key 73），按方法 msgId 匹配.
+
+        每次调用使用唯一的方法 msgId，同一设备可以同时调用多个相同的方法.
 
-    async def _async_data_publish(self, device_id: str, cmd: int, prio: int, msg_id: int, data: dict = None):
+        Args:
+            device_id: 设备ID
+            data: 方法数据（siid、aiid、in）
+            timeout: 超时时间（秒）
+
+        Returns:
+            dict: 方法回复数据，超时抛出 asyncio.TimeoutError
+        """
+        self.sender_msgId += 1
+        method_msg_id = self.sender_msgId
+        # 先登记再发送，避免回复先于登记到达
+        request = self._requests.register(device_id, '73', method_msg_id)
+        await self._sender_method_data(device_id, data, method_msg_id)
+        return await self._requests.async_wait(request, timeout)
+
+    async def _async_data_publish(self, device_id: str, cmd: int, prio: int, msg_id: int, data: dict = None, static_key: str = None):
         """异步发送数据.
         
         Args:
@@ -663,31 +913,11 @@ class MqttClient:
             prio: 优先级
             msg_id: 消息ID
             data: 要发送的数据,可选参数
+            static_key: 不可变数据的缓存键，数据只加密一次
         """
         try:
-            if data:  # 如果有数据需要发送
-                plaintext = json.dumps(data, separators=(',', ':'))
-                sender_data = encrypt_data(plaintext)
-                response = {
-                    "cmd": cmd,
-                    "dir": "30",
-                    "msgId": msg_id,
-                    "prio": prio,
-                    "ver": "2.3",
-                    "timestamp": int(time.time() * 1000),
-                    "data": sender_data
-                }
-            else:  # 如果不需要发送数据
-                response = {
-                    "cmd": cmd,
-                    "dir": "30",
-                    "msgId": msg_id,
-                    "prio": prio,
-                    "ver": "2.3",
-                    "timestamp": int(time.time() * 1000)
-                }
-            
-            return await self.async_publish(device_id, json.dumps(response))
+            payload = self._frames.build(cmd, prio, msg_id, data, static_key)
+            return await self.async_publish(device_id, payload)
         except Exception as e:
             return False
 
@@ -729,9 +959,9 @@ class MqttClient:
             pass
 
     # 取设备存在的区域
-    async def get_device_area(self, device_id: str):
-        sub_data = {"msgId": 99, "siid": 6, "aiid": 5, "in": [{"1": 1}]}
-        await self._sender_method_data(device_id, sub_data)
+    async def get_device_area(self, device_id: str) -> dict:
+        sub_data = {"siid": 6, "aiid": 5, "in": [{"1": 1}]}
+        return await self.async_call_method(device_id, sub_data)
 
     # 设备解除绑定
     async def sender_unbind_data(self, device_id: str):
@@ -745,7 +975,7 @@ class MqttClient:
 
     # 发送重置无人命令
     async def send_reset_nobody_data(self, device_id: str, value: int):
-        sub_data = {"msgId": 55, "siid": 5, "aiid": 1, "in": [{"5": value}]}
+        sub_data = {"siid": 5, "aiid": 1, "in": [{"5": value}]}
         await self._sender_method_data(device_id, sub_data)
 
     # 发送学习命令
@@ -757,56 +987,60 @@ class MqttClient:
         await self._sender_profile_data(device_id, sub_data)
 
     # 发送单个设备的户型数据
-    async def send_single_device_apartment_data(self, device_id: str, device_data: dict) -> bool:
-        """发送单个设备的户型数据."""
-        try:            
-            # 构造单个设备的数据
-            room_data = {"params": [{"61": json.dumps(device_data, separators=(',', ':'))}]}
-            
-            # 发送数据并等待响应
-            success = False
-            retry_count = 0
-            max_retries = 3
-            
-            while not success and retry_count < max_retries:
-                try:
-                    await self._sender_profile_data(device_id, room_data)
-                    
-                    # 等待响应
-                    response = await self._wait_for_response(device_id, timeout=30)
-                    
-                    if response and response.get('cmd') == 2006 and response.get('key') == 74:
-                        value = response.get('value')
-                        if value == '0':
-                            # 发送事件通知前端
-                            self.hass.bus.async_fire(EVENT_DATA_FORMAT_ERROR, {
-                                "room_id": device_data.get('room_id'),
-                                "message": "户型数据格式有误"
-                            })
-                            return False
-                        else:
-                            return True
-                    else:
-                        retry_count += 1
-                        if retry_count < max_retries:
-                            await asyncio.sleep(1)
-                            
-                except asyncio.TimeoutError:
-                    retry_count += 1
-                    if retry_count < max_retries:
-                        await asyncio.sleep(1)
-                except Exception as e:
-                    retry_count += 1
-                    if retry_count < max_retries:
-                        await asyncio.sleep(1)
-            
-            if not success:
-                _LOGGER.debug('mqtt -- 设备 %s 户型数据发送失败，已达到最大重试次数', device_id)
-            
-            return success
-            
-        except Exception as e:
-            return False
+    async def send_single_device_apartment_data(self, device_id: str, device_data: dict, on_attempt=None) -> bool:
+        """发送单个设备的户型数据.
+
+        Args:
+            device_id: 设备ID
+            device_data: 设备户型数据
+            on_attempt: 每次尝试发送前的回调，参数为尝试次数
+        """
+        # 构造单个设备的数据
+        room_data = {"params": [{"61": dumps(device_data)}]}
+        # 设备应用后回复新版本号，格式错误时回复 '0'；其他值（例如旧版本的上报）不是本次推送的回复
+        version = device_data.get('version')
+        expected = (version, '0', 0) if version else None
+
+        for attempt in range(1, LAYOUT_PUSH_MAX_RETRIES + 1):
+            if on_attempt:
+                on_attempt(attempt)
+            try:
+                # 发送数据并等待 key 74 回复
+                value = await self.async_request_properties(device_id, room_data, '74', expected=expected)
+                if value == '0':
+                    # 发送事件通知前端
+                    self.hass.bus.async_fire(EVENT_DATA_FORMAT_ERROR, {
+                        "room_id": device_data.get('room_id'),
+                        "message": "户型数据格式有误"
+                    })
+                    return False
+                return True
+            except asyncio.TimeoutError:
+                pass
+            except Exception as e:
+                _LOGGER.debug('mqtt -- 设备 %s 户型数据发送出错: %s', device_id, str(e))
+
+            if attempt < LAYOUT_PUSH_MAX_RETRIES:
+                # 指数退避
+                await asyncio.sleep(LAYOUT_PUSH_BACKOFF * 2 ** (attempt - 1))
+
+        _LOGGER.debug('mqtt -- 设备 %s 户型数据发送失败，已达到最大重试次数', device_id)
+        return False
+
+    def _schedule_apartment_sync(self, device_id: str, version_str: str) -> None:
+        """在后台同步户型数据.
+
+        处理器运行在设备的接收队列中，同步需要等待同一设备的 key 74 回复，
+        在队列中等待会阻塞回复本身，因此不能在处理器中等待. 每个设备同时只有一个同步任务.
+        """
+        task = self._sync_tasks.get(device_id)
+        if task is not None and not task.done():
+            return
+        task = self.hass.async_create_task(self.sync_apartment_data(device_id, version_str))
+        self._sync_tasks[device_id] = task
+        task.add_done_callback(
+            lambda done: self._sync_tasks.pop(device_id, None) if self._sync_tasks.get(device_id) is done else None
+        )
 
     async def sync_apartment_data(self, device_id: str, version_str: str):
         """同步户型数据."""
@@ -822,9 +1056,8 @@ class MqttClient:
             if not apartment_id or not received_version:
                 return
                             
-            # 加载户型的 sender_data
-            sender_store = Store(self.hass, STORAGE_VERSION, f"{APARTMENT_DATA_KEY}_{apartment_id}_sender")
-            sender_data = await sender_store.async_load()
+            # 获取户型的 sender_data
+            sender_data = self.layout_index.get_sender_data(int(apartment_id))
             
             if not sender_data or device_id not in sender_data:
                 return
@@ -834,7 +1067,7 @@ class MqttClient:
             current_version = device_data.get('version')
             
             
-            # 比较版本
+            # 比较版本（版本号由内容哈希生成，内容未变化时不会重复下发）
             if str(current_version) != str(received_version):
                 await self.send_single_device_apartment_data(device_id, device_data)
             else:
@@ -843,72 +1076,38 @@ class MqttClient:
         except Exception as e:
             _LOGGER.debug('mqtt -- 同步户型数据失败: %s', str(e))
 
-    async def send_apartment_data(self, sender_data: dict) -> None:
-        """发送户型数据."""
-        try:            
-            # 遍历所有设备ID
-            for device_id, device_data in sender_data.items():
-                # 检查设备是否在线
-                entity_id = f"sensor.airibes_radar_{device_id.lower()}"
-                entity_state = self.hass.states.get(entity_id)
-                
-                if entity_state and entity_state.state == "在线":
-                    try:
-                        await self.send_single_device_apartment_data(device_id, device_data)
-                    except Exception as e:
-                        continue
-                else:
-                    continue
-            
-            _LOGGER.debug("所有户型数据发送完成")
-            
-        except Exception as e:
-            raise
+    def send_apartment_data(self, sender_data: dict, apartment_id: int = None):
+        """发送户型数据到所有在线设备.
 
-    async def _wait_for_response(self, device_id: str, timeout: int = 60) -> dict:
-        """等待设备响应.
-        
-        Args:
-            device_id: 设备ID
-            timeout: 超时时间（秒），默认60秒
+        推送在后台并发执行，立即返回推送任务，可通过任务ID查询进度.
+
+        Returns:
+            LayoutPushJob: 推送任务
         """
-        if not hasattr(self, '_response_callbacks'):
-            self._response_callbacks = {}
-            
-        try:
-            # 创建Future对象用于等待响应
-            future = asyncio.Future()
-            
-            def response_callback(response):
-                if not future.done():
-                    future.set_result(response)
-            
-            # 添加响应回调前先清理可能存在的旧回调
-            self._response_callbacks.pop(device_id, None)
-            # 添加新的响应回调
-            self._response_callbacks[device_id] = response_callback
-            
-            try:
-                # 等待响应，使用指定的超时时间
-                return await asyncio.wait_for(future, timeout)
-            finally:
-                # 确保在任何情况下都清理回调
-                if device_id in self._response_callbacks and self._response_callbacks[device_id] == response_callback:
-                    self._response_callbacks.pop(device_id, None)
-                
-        except asyncio.TimeoutError:
-            _LOGGER.warning(f"等待设备 {device_id} 响应超时（{timeout}秒）")
-            raise
-        except Exception as e:
-            _LOGGER.error(f"等待设备 {device_id} 响应时出错: {str(e)}")
-            raise
+        online_data = {}
+        skipped = []
+        for device_id, device_data in sender_data.items():
+            # 检查设备是否在线
+            if self.is_device_online(device_id):
+                online_data[device_id] = device_data
+            else:
+                # 离线设备缓存户型数据，上线后发送
+                self._outbox.put(device_id, [{"61": dumps(device_data)}])
+                skipped.append(device_id)
+
+        return self.push_jobs.start(apartment_id, online_data, skipped)
 
     async def send_start_cmd(self, device_id: str) -> None:
         """发送开启命令."""
         try:
             cmd_data = {"params": [{"13": 1}]}  # 开启命令
+            # 设备上报新的开关状态前不再认为状态已知
+            self._snapshot.discard(device_id, "13")
             await self._sender_profile_data(device_id, cmd_data)
-            await self._sender_for_status_cmd(device_id, [74, 76])
+            # 只查询缓存已过期的户型版本和人员位置
+            stale_keys = self._snapshot.stale_keys(device_id, [74, 76], SNAPSHOT_MAX_AGE)
+            if stale_keys:
+                await self._sender_for_status_cmd(device_id, stale_keys)
         except Exception as e:
             _LOGGER.error(f"发送开启命令失败: {str(e)}")
 
@@ -916,6 +1115,7 @@ class MqttClient:
         """发送停止命令."""
         try:
             cmd_data = {"params": [{"13": 0}]}  # 停止命令
+            self._snapshot.discard(device_id, "13")
             await self._sender_profile_data(device_id, cmd_data)
         except Exception as e:
             _LOGGER.error(f"发送停止命令失败: {str(e)}")
@@ -924,44 +1124,26 @@ class MqttClient:
         """发送开始校准命令."""
         print("door_position:", door_position)
         try:
-            sub_data = {"msgId": 77, "siid": 12, "aiid": 1, "in": [{"4": door_position['x']}, {"5": door_position['y']}]}
+            sub_data = {"siid": 12, "aiid": 1, "in": [{"4": door_position['x']}, {"5": door_position['y']}]}
             await self._sender_method_data(device_id, sub_data)
         except Exception as e:
             _LOGGER.error(f"发送开始校准命令失败: {str(e)}")
 
     async def update_room_status(self, device_id: str, value: int):
         """更新房间状态"""
-        try:            
-            # 获取户型列表
-            apartments_store = Store(self.hass, STORAGE_VERSION, APARTMENTS_STORAGE_KEY)
-            apartments_data = await apartments_store.async_load()
-            
-            # 遍历所有户型查找设备
-            device_info = None
-            apartment_id = None
-            
-            if apartments_data and 'apartments' in apartments_data:
-                for apartment in apartments_data['apartments']:
-                    apartment_id = apartment['id']
-
-                    # 加载户型的 sender_data
-                    sender_store = Store(self.hass, STORAGE_VERSION, f"{APARTMENT_DATA_KEY}_{apartment_id}_sender")
-                    sender_data = await sender_store.async_load()
-                    if sender_data and device_id in sender_data:
-                        device_info = sender_data[device_id]
-                        break
-
-            if not device_info or not apartment_id:
+        try:
+            location = self.layout_index.get(device_id)
+            if not location:
                 _LOGGER.error(f"找不到设备 {device_id} 对应的房间信息")
                 return
-            
-            room_id = device_info.get("room_id")
+
+            room_id = location.room_id
             if room_id is None:
                 _LOGGER.error(f"设备 {device_id} 的房间ID为空")
                 return
             
             # 获取房间传感器实体并更新其状态
-            sensor_key = f"apartment_{apartment_id}_room_{room_id}"
+            sensor_key = f"apartment_{location.apartment_id}_room_{room_id}"
             room_sensor = self.hass.data[DOMAIN].get('room_sensors', {}).get(sensor_key)
             if room_sensor:
                 room_sensor.set_state(value == 1)
@@ -974,42 +1156,12 @@ class MqttClient:
     async def update_area_status(self, device_id: str, area_id: int, has_person: bool):
         """更新区域状态"""
         try:
-            # 获取户型列表
-            apartments_store = Store(self.hass, STORAGE_VERSION, APARTMENTS_STORAGE_KEY)
-            apartments_data = await apartments_store.async_load()
-            
-            # 遍历所有户型查找设备
-            device_info = None
-            apartment_id = None
-            
-            if apartments_data and 'apartments' in apartments_data:
-                for apartment in apartments_data['apartments']:
-                    apartment_id = apartment['id']
-                    
-                    # 加载户型的 sender_data
-                    sender_store = Store(self.hass, STORAGE_VERSION, f"{APARTMENT_DATA_KEY}_{apartment_id}_sender")
-                    sender_data = await sender_store.async_load()
-                    
-                    if sender_data and device_id in sender_data:
-                        device_info = sender_data[device_id]
-                        
-                        # 检查区域ID是否属于这个设备
-                        if 'region' in device_info:
-                            # 遍历 region 数组查找匹配的 area_id
-                            for region in device_info['region']:
-                                if region.get('area-id') == area_id:
-                                    break
-                            else:
-                                # 如果遍历完没找到匹配的区域，继续检查下一户型
-                                continue
-                            # 找到匹配的区域，跳出户型循环
-                            break
-                        
-            if not device_info or not apartment_id:
+            location = self.layout_index.get(device_id)
+            if not location:
                 return
             
             # 获取区域传感器实体并更新其状态
-            sensor_key = f"apartment_{apartment_id}_area_{area_id}"
+            sensor_key = f"apartment_{location.apartment_id}_area_{area_id}"
             area_sensor = self.hass.data[DOMAIN].get('area_sensors', {}).get(sensor_key)
             if area_sensor:
                 area_sensor.set_state(has_person)
@@ -1022,94 +1174,50 @@ class MqttClient:
     async def notify_area_movement(self, source_device_id: str, area_id: int, direction: int, frames: int, number: int):
         """通知其他设备区域移动事件."""
         try:
-            # 获取户型列表
-            apartments_store = Store(self.hass, STORAGE_VERSION, APARTMENTS_STORAGE_KEY)
-            apartments_data = await apartments_store.async_load()
-            
-            if apartments_data and 'apartments' in apartments_data:
-                for apartment in apartments_data['apartments']:
-                    apartment_id = apartment['id']
-                    
-                    # 加载户型的 sender_data
-                    sender_store = Store(self.hass, STORAGE_VERSION, f"{APARTMENT_DATA_KEY}_{apartment_id}_sender")
-                    sender_data = await sender_store.async_load()
-                    
-                    if sender_data and source_device_id in sender_data:
-                        # 遍历其他设备
-                        for target_device_id, device_info in sender_data.items():
-                            # 跳过源设备
-                            if target_device_id == source_device_id:
-                                continue
-                            
-                            # 检查设备的区域配置
-                            if 'region' in device_info:
-                                for region in device_info['region']:
-                                    if region.get('area-id') == area_id:
-                                        sub_data = {"msgId": 8, "siid": 13, "aiid": 4, "in": [{"1": area_id}, {"21": direction}, {"26": frames}, {"27": number}]}
-                                        await self._sender_method_data(target_device_id, sub_data)
-                                        break
+            target_device_ids = self.layout_index.get_area_peers(source_device_id, area_id)
+            if not target_device_ids:
+                return
+
+            sub_data = {"siid": 13, "aiid": 4, "in": [{"1": area_id}, {"21": direction}, {"26": frames}, {"27": number}]}
+            # 并行通知所有共享该区域的设备
+            await asyncio.gather(
+                *(self._sender_method_data(target_device_id, sub_data) for target_device_id in target_device_ids)
+            )
         
         except Exception as e:
             _LOGGER.error('mqtt -- 处理区域移动通知失败: %s', str(e))
 
-    async def send_common_door_id_to_device(self, device_id: str):
-        """发送共用门id给设备."""
-        try:            
-            # 获取户型列表
-            apartments_store = Store(self.hass, STORAGE_VERSION, APARTMENTS_STORAGE_KEY)
-            apartments_data = await apartments_store.async_load()
-            
-            if not apartments_data or 'apartments' not in apartments_data:
-                return
-            
-            common_doors = set()  # 用于存储共用门的ID
-            
-            # 遍历所有户型
-            for apartment in apartments_data['apartments']:
-                apartment_id = apartment['id']
-                
-                # 加载户型的 sender_data
-                sender_store = Store(self.hass, STORAGE_VERSION, f"{APARTMENT_DATA_KEY}_{apartment_id}_sender")
-                sender_data = await sender_store.async_load()
-                
-                if not sender_data:
-                    continue
-                    
-                # 如果只有一个设备，跳过这个户型
-                if len(sender_data) <= 1:
-                    continue
-                
-                # 如果当前设备不在这个户型中，跳过
-                if device_id not in sender_data:
-                    continue
-                
-                # 获取当前设备的区域数据
-                current_device_regions = sender_data[device_id].get('region', [])
-                
-                # 遍历其他设备
-                for other_device_id, other_device_data in sender_data.items():
-                    if other_device_id == device_id:
-                        continue
-                        
-                    other_device_regions = other_device_data.get('region', [])
-                    
-                    # 查找共用门
-                    for region in current_device_regions:
-                        if region.get('area-attribute') == 2:  # 门区域
-                            area_id = region.get('area-id')
-                            # 在其他设备的区域中查找相同的门
-                            for other_region in other_device_regions:
-                                if (other_region.get('area-attribute') == 2 and 
-                                    other_region.get('area-id') == area_id):
-                                    common_doors.add(area_id)
-            
-            # 如果找到共用门，发送到设备
-            if common_doors:
-                for door_id in common_doors:
-                    sub_data = {"msgId": 19, "siid": 13, "aiid": 5, "in": [{"1": door_id}]}
-                    await self._sender_method_data(device_id, sub_data)
-            else:
+    async def send_common_door_id_to_device(self, device_id: str, version: str = None):
+        """发送共用门id给设备.
+
+        Args:
+            device_id: 设备ID
+            version: 设备上报的户型版本号，为空时使用当前保存的版本号
+        """
+        try:
+            common_doors = self.layout_index.get_common_doors(device_id)
+            if not common_doors:
                 _LOGGER.debug("未找到共用门: device_id=%s", device_id)
+                return
+
+            if version is None:
+                version = self.layout_index.get_version(device_id)
+
+            sent_version, sent_doors = self._sent_common_doors.get(device_id, (None, frozenset()))
+            if version != sent_version:
+                # 设备户型版本变化，需要重新下发全部共用门
+                sent_doors = frozenset()
+
+            pending_doors = common_doors - sent_doors
+            if not pending_doors:
+                _LOGGER.debug("共用门已是最新，无需发送: device_id=%s", device_id)
+                return
+
+            for door_id in pending_doors:
+                sub_data = {"siid": 13, "aiid": 5, "in": [{"1": door_id}]}
+                await self._sender_method_data(device_id, sub_data)
+
+            self._sent_common_doors[device_id] = (version, sent_doors | pending_doors)
                 
         except Exception as e:
             _LOGGER.debug("发送共用门ID失败: %s", str(e))
@@ -1160,7 +1268,13 @@ class MqttClient:
                 if sender_data and device_id in sender_data:
                     # 删除设备数据
                     del sender_data[device_id]
-                    await sender_store.async_save(sender_data)            
+                    await sender_store.async_save(sender_data)
+
+            # 更新设备布局索引
+            self._targets.clear(device_id)
+            self._snapshot.remove(device_id)
+            self.positions.remove(device_id)
+            await self.layout_index.async_remove_device(device_id)
         except Exception as e:
             _LOGGER.debug("删除户型数据中的设备失败: %s", str(e))
         
\ No newline at end of file
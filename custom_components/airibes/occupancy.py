@@ -0,0 +1,223 @@
+"""Spatial occupancy from live person targets for airibes."""
+import logging
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖，未安装时使用网格索引
+    np = None
+
+_LOGGER = logging.getLogger(__name__)
+
+ROOM = "room"
+AREA = "area"
+
+
+def _bounds(points: list) -> tuple:
+    """获取顶点列表的外接矩形 (x0, y0, x1, y1)."""
+    xs = [point['x'] for point in points]
+    ys = [point['y'] for point in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def build_regions(sender_data: dict) -> list:
+    """从 sender_data 提取房间和区域矩形（毫米）.
+
+    Returns:
+        list: [((ROOM|AREA, id), (x0, y0, x1, y1)), ...]，同一房间/区域只保留一次
+    """
+    regions = {}
+    for device_info in sender_data.values():
+        room_id = device_info.get('room_id')
+        room_region = device_info.get('roomRegion')
+        if room_id is not None and room_region:
+            regions.setdefault((ROOM, str(room_id)), _bounds(room_region))
+        for region in device_info.get('region', []):
+            area_id = region.get('area-id')
+            points = region.get('points')
+            if area_id is not None and points:
+                regions.setdefault((AREA, str(area_id)), _bounds(points))
+    return list(regions.items())
+
+
+class SpatialGrid:
+    """均匀网格空间索引，每个格子保存与其相交的矩形."""
+
+    __slots__ = ("cell_size", "cells")
+
+    def __init__(self, regions: list, cell_size: float):
+        """根据矩形列表建立网格.
+
+        Args:
+            regions: [(key, (x0, y0, x1, y1)), ...]
+            cell_size: 格子边长，与矩形坐标单位相同
+        """
+        self.cell_size = cell_size
+        self.cells = {}
+        for key, rect in regions:
+            x0, y0, x1, y1 = rect
+            for cx in range(int(x0 // cell_size), int(x1 // cell_size) + 1):
+                for cy in range(int(y0 // cell_size), int(y1 // cell_size) + 1):
+                    self.cells.setdefault((cx, cy), []).append((key, rect))
+
+    def query(self, x: float, y: float) -> list:
+        """获取包含该点的所有矩形的 key."""
+        cell_size = self.cell_size
+        candidates = self.cells.get((int(x // cell_size), int(y // cell_size)), ())
+        return [
+            key for key, (x0, y0, x1, y1) in candidates
+            if x0 <= x <= x1 and y0 <= y <= y1
+        ]
+
+
+class RegionClassifier:
+    """批量判断点所在的房间和区域.
+
+    安装了 numpy 时，所有矩形边界另外保存为连续数组，目标较多的一帧用一次向量化比较完成分类；
+    目标较少或未安装 numpy 时逐点查询均匀网格（此时网格更快）.
+    """
+
+    def __init__(self, regions: list, cell_size: float, min_batch: int = 0, use_numpy: bool = None):
+        """初始化分类器.
+
+        Args:
+            regions: [(key, (x0, y0, x1, y1)), ...]
+            cell_size: 网格格子边长，与矩形坐标单位相同
+            min_batch: 使用 numpy 的最少点数
+            use_numpy: 是否使用 numpy，默认在已安装时使用
+        """
+        self.keys = [key for key, _rect in regions]
+        self.min_batch = min_batch
+        self.use_numpy = np is not None and (use_numpy is None or use_numpy)
+        self._grid = SpatialGrid(regions, cell_size)
+        if self.use_numpy:
+            bounds = np.array([rect for _key, rect in regions], dtype=np.float64).reshape(-1, 4)
+            self._x0, self._y0, self._x1, self._y1 = (
+                np.ascontiguousarray(bounds[:, i]) for i in range(4)
+            )
+
+    def _vectorized(self, points: list) -> bool:
+        """是否对这批点使用 numpy."""
+        return self.use_numpy and len(points) >= self.min_batch
+
+    def _mask(self, points: list):
+        """计算 (点数, 区域数) 的包含关系矩阵."""
+        coords = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        xs = coords[:, 0, None]
+        ys = coords[:, 1, None]
+        return (xs >= self._x0) & (xs <= self._x1) & (ys >= self._y0) & (ys <= self._y1)
+
+    def classify(self, points: list) -> list:
+        """获取每个点所在的房间和区域.
+
+        Args:
+            points: [(x, y), ...]
+
+        Returns:
+            list: 与 points 对应的 key 列表
+        """
+        if not points:
+            return []
+        if not self._vectorized(points):
+            return [self._grid.query(x, y) for x, y in points]
+        keys = self.keys
+        return [[keys[i] for i in np.flatnonzero(row)] for row in self._mask(points)]
+
+    def count(self, points: list) -> dict:
+        """统计每个房间和区域中的点数，只返回有点的 key."""
+        if not points:
+            return {}
+        if not self._vectorized(points):
+            counts = {}
+            for x, y in points:
+                for key in self._grid.query(x, y):
+                    counts[key] = counts.get(key, 0) + 1
+            return counts
+        keys = self.keys
+        totals = self._mask(points).sum(axis=0)
+        return {keys[i]: int(totals[i]) for i in np.flatnonzero(totals)}
+
+
+class OccupancyEngine:
+    """根据人员位置计算每个房间和区域的人数.
+
+    人数写入房间和区域传感器的 person_count，传感器状态为雷达上报的状态与人数的或，
+    两者不会互相覆盖.
+    """
+
+    def __init__(self, hass: HomeAssistant, cell_size: float, numpy_min_batch: int = 0):
+        """初始化占用计算.
+
+        Args:
+            cell_size: 空间网格的格子边长（毫米）
+            numpy_min_batch: 一帧目标数达到该值时使用 numpy 批量分类
+        """
+        self.hass = hass
+        self._cell_size = cell_size
+        self._numpy_min_batch = numpy_min_batch
+        self._classifiers = {}  # apartment_id -> RegionClassifier
+        self._counts = {}  # apartment_id -> {(ROOM|AREA, id): 人数}
+
+    def rebuild(self, apartment_id, sender_data: dict) -> None:
+        """根据户型的 sender_data 重建空间网格."""
+        regions = build_regions(sender_data)
+        if regions:
+            self._classifiers[apartment_id] = RegionClassifier(regions, self._cell_size, self._numpy_min_batch)
+        else:
+            self._classifiers.pop(apartment_id, None)
+        self.reset(apartment_id)
+
+    def classify(self, apartment_id, x: float, y: float) -> list:
+        """获取户型中包含该点（毫米）的房间和区域."""
+        classifier = self._classifiers.get(apartment_id)
+        if classifier is None:
+            return []
+        return classifier.classify([(x, y)])[0]
+
+    def update(self, apartment_id, frame: dict) -> None:
+        """根据户型所有雷达的人员位置更新人数.
+
+        Args:
+            frame: {device_id: [{"id", "x", "y"}]}，坐标单位为厘米
+        """
+        classifier = self._classifiers.get(apartment_id)
+        if classifier is None:
+            return
+        # 一帧所有目标一次批量分类（厘米转毫米）
+        counts = classifier.count([
+            (pos["x"] * 10, pos["y"] * 10)
+            for positions in frame.values()
+            for pos in positions
+        ])
+
+        previous = self._counts.get(apartment_id, {})
+        self._counts[apartment_id] = counts
+        for key in previous.keys() | counts.keys():
+            count = counts.get(key, 0)
+            if count != previous.get(key, 0):
+                self._set_sensor(apartment_id, key, count)
+
+    def reset(self, apartment_id) -> None:
+        """忘记户型的人数（例如雷达停止推送位置），传感器只保留雷达上报的状态."""
+        for key in self._counts.pop(apartment_id, {}):
+            self._set_sensor(apartment_id, key, 0)
+
+    def get_counts(self, apartment_id) -> dict:
+        """获取户型中每个房间和区域的人数."""
+        counts = self._counts.get(apartment_id, {})
+        return {
+            "rooms": {key_id: count for (kind, key_id), count in counts.items() if kind == ROOM},
+            "areas": {key_id: count for (kind, key_id), count in counts.items() if kind == AREA},
+        }
+
+    def _set_sensor(self, apartment_id, key: tuple, count: int) -> None:
+        """更新房间或区域传感器的人数."""
+        kind, key_id = key
+        sensors = self.hass.data[DOMAIN].get(f"{kind}_sensors", {})
+        sensor = sensors.get(f"apartment_{apartment_id}_{kind}_{key_id}")
+        if sensor:
+            _LOGGER.debug("根据人员位置更新 %s %s 人数: %s", kind, key_id, count)
+            sensor.set_person_count(count)
@@ -0,0 +1,46 @@
+"""Offline command outbox for airibes."""
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CommandOutbox:
+    """离线设备的属性指令缓存，每个属性 key 只保留最新的值."""
+
+    def __init__(self):
+        """初始化指令缓存."""
+        self._pending = {}  # device_id -> {key: value}
+
+    def put(self, device_id: str, params: list) -> None:
+        """缓存属性指令，覆盖同一 key 之前的值.
+
+        Args:
+            device_id: 设备ID
+            params: 属性列表，例如 [{"8": 1}, {"16": 0}]
+        """
+        pending = self._pending.setdefault(device_id, {})
+        for param in params:
+            for key, value in param.items():
+                # 先删除再写入，使合并后的顺序与最后一次写入的顺序一致
+                pending.pop(key, None)
+                pending[key] = value
+        _LOGGER.debug("设备 %s 离线，缓存指令: %s", device_id, list(pending))
+
+    def has_pending(self, device_id: str) -> bool:
+        """是否有缓存的指令."""
+        return bool(self._pending.get(device_id))
+
+    def pop(self, device_id: str) -> list:
+        """取出并清空设备缓存的指令.
+
+        Returns:
+            list: 合并后的属性列表，没有缓存时为空列表
+        """
+        pending = self._pending.pop(device_id, None)
+        if not pending:
+            return []
+        return [{key: value} for key, value in pending.items()]
+
+    def discard(self, device_id: str) -> None:
+        """丢弃设备缓存的指令（例如设备被删除）."""
+        self._pending.pop(device_id, None)
@@ -0,0 +1,190 @@
+"""Person position aggregation for airibes."""
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .fusion import TargetFusion
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def diff_frames(previous: dict, frame: dict) -> dict:
+    """计算两帧之间的差异.
+
+    Returns:
+        dict: devices 为有变化的目标，removed 为消失的目标ID，removed_devices 为消失的设备
+    """
+    devices = {}
+    removed = {}
+    for device_id, positions in frame.items():
+        old_by_id = {pos["id"]: pos for pos in previous.get(device_id, ())}
+        changed = [
+            pos for pos in positions
+            if (old := old_by_id.pop(pos["id"], None)) is None
+            or old["x"] != pos["x"] or old["y"] != pos["y"]
+        ]
+        if changed:
+            devices[device_id] = changed
+        if old_by_id:
+            removed[device_id] = list(old_by_id)
+    return {
+        "devices": devices,
+        "removed": removed,
+        "removed_devices": [device_id for device_id in previous if device_id not in frame],
+    }
+
+
+class PositionAggregator:
+    """合并所有雷达的人员位置，按固定频率为每个户型发送一帧.
+
+    位置更新只记录最新值并标记所在户型，定时器触发时每个订阅的户型最多发送一帧；
+    所有目标移动距离都小于死区时跳过该帧. 位置在进入聚合器前已转换为户型坐标，
+    发送前合并多个雷达重复看到的同一个人.
+    """
+
+    def __init__(self, hass: HomeAssistant, layout_index, rate: float, deadband: float, gate: float):
+        """初始化位置聚合器.
+
+        Args:
+            layout_index: 设备布局索引，用于查找设备所在户型
+            rate: 每秒最多发送的帧数
+            deadband: 位置变化死区（厘米）
+            gate: 多雷达目标融合的关联门限（厘米）
+        """
+        self.hass = hass
+        self._layout_index = layout_index
+        self._interval = 1 / rate
+        self._deadband = deadband
+        self._fusion = TargetFusion(gate)
+        self._positions = {}  # device_id -> [{"id", "x", "y"}]（厘米）
+        self._dirty = set()   # 待发送的户型ID
+        self._emitted = {}    # apartment_id -> 上次发送的 {device_id: positions}
+        self._listeners = {}  # apartment_id -> [listener]
+        self._global_listeners = []  # 接收所有户型帧的监听者
+        self._unsub = None
+
+    def get(self, device_id: str) -> list:
+        """获取设备当前的人员位置."""
+        return self._positions.get(device_id, [])
+
+    def get_frame(self, apartment_id) -> dict:
+        """获取户型当前融合后的人员位置.
+
+        目标沿用上一帧的融合ID，重复调用不会改变融合结果.
+        """
+        frame = {
+            device_id: positions
+            for device_id, positions in self._positions.items()
+            if (location := self._layout_index.get(device_id)) is not None
+            and location.apartment_id == apartment_id
+        }
+        return self._fusion.fuse(apartment_id, frame)
+
+    @callback
+    def async_subscribe(self, apartment_id, listener):
+        """订阅户型的人员位置帧.
+
+        Args:
+            listener: 回调函数，参数为 {device_id: positions}
+
+        Returns:
+            取消订阅的函数
+        """
+        listeners = self._listeners.setdefault(apartment_id, [])
+        listeners.append(listener)
+
+        @callback
+        def unsubscribe() -> None:
+            listeners.remove(listener)
+            if not listeners:
+                del self._listeners[apartment_id]
+                self._emitted.pop(apartment_id, None)
+
+        return unsubscribe
+
+    @callback
+    def async_subscribe_all(self, listener):
+        """订阅所有户型的人员位置帧.
+
+        Args:
+            listener: 回调函数，参数为 (apartment_id, {device_id: positions})
+
+        Returns:
+            取消订阅的函数
+        """
+        self._global_listeners.append(listener)
+
+        @callback
+        def unsubscribe() -> None:
+            self._global_listeners.remove(listener)
+
+        return unsubscribe
+
+    def update(self, device_id: str, positions: list) -> None:
+        """记录设备最新的人员位置."""
+        self._positions[device_id] = positions
+        self._mark_dirty(device_id)
+
+    def clear(self, device_id: str) -> None:
+        """清空设备的人员位置（例如设备离线）."""
+        if self._positions.get(device_id):
+            self._positions[device_id] = []
+            self._mark_dirty(device_id)
+
+    def remove(self, device_id: str) -> None:
+        """移除设备（例如设备被删除）."""
+        if self._positions.pop(device_id, None) is not None:
+            self._mark_dirty(device_id)
+
+    def async_stop(self) -> None:
+        """取消待发送的帧."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        self._dirty.clear()
+
+    def _mark_dirty(self, device_id: str) -> None:
+        """标记设备所在户型需要发送."""
+        location = self._layout_index.get(device_id)
+        if location is None:
+            return
+        self._dirty.add(location.apartment_id)
+        if self._unsub is None:
+            self._unsub = async_call_later(self.hass, self._interval, self._async_flush)
+
+    @callback
+    def _async_flush(self, _now=None) -> None:
+        """为每个有更新且有订阅的户型发送一帧."""
+        self._unsub = None
+        dirty, self._dirty = self._dirty, set()
+        for apartment_id in dirty:
+            listeners = self._listeners.get(apartment_id, ())
+            if not listeners and not self._global_listeners:
+                continue
+            frame = self.get_frame(apartment_id)
+            if not self._changed(self._emitted.get(apartment_id), frame):
+                continue
+            self._emitted[apartment_id] = frame
+            for listener in list(listeners):
+                listener(frame)
+            for listener in list(self._global_listeners):
+                listener(apartment_id, frame)
+
+    def _changed(self, previous, frame: dict) -> bool:
+        """判断新帧相对上次发送的帧是否有超过死区的变化."""
+        if previous is None or previous.keys() != frame.keys():
+            return True
+        deadband = self._deadband
+        for device_id, positions in frame.items():
+            old_positions = previous[device_id]
+            if len(old_positions) != len(positions):
+                return True
+            old_by_id = {pos["id"]: pos for pos in old_positions}
+            for pos in positions:
+                old = old_by_id.get(pos["id"])
+                if old is None:
+                    return True
+                if abs(pos["x"] - old["x"]) >= deadband or abs(pos["y"] - old["y"]) >= deadband:
+                    return True
+        return False
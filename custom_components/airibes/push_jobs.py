@@ -0,0 +1,139 @@
+"""Layout push jobs for airibes."""
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+EVENT_PUSH_PROGRESS = f"{DOMAIN}_apartment_push_progress"
+
+# 设备推送状态
+PUSH_PENDING = "pending"
+PUSH_SENDING = "sending"
+PUSH_SUCCESS = "success"
+PUSH_FAILED = "failed"
+PUSH_SKIPPED = "skipped"   # 设备离线，未推送
+
+MAX_FINISHED_JOBS = 20
+
+
+class LayoutPushJob:
+    """一次户型数据推送任务."""
+
+    def __init__(self, job_id: str, apartment_id, device_ids: list):
+        """初始化推送任务."""
+        self.job_id = job_id
+        self.apartment_id = apartment_id
+        self.created = int(time.time())
+        self.finished = None
+        self.devices = {
+            device_id: {"status": PUSH_PENDING, "attempts": 0}
+            for device_id in device_ids
+        }
+        self.task = None
+
+    @property
+    def done(self) -> bool:
+        """任务是否已结束."""
+        return self.finished is not None
+
+    def as_dict(self) -> dict:
+        """转换为字典."""
+        return {
+            "job_id": self.job_id,
+            "apartment_id": self.apartment_id,
+            "created": self.created,
+            "finished": self.finished,
+            "done": self.done,
+            "devices": self.devices,
+        }
+
+
+class LayoutPushManager:
+    """并发推送户型数据到多个雷达，限制并发数量并记录每个设备的进度."""
+
+    def __init__(self, hass: HomeAssistant, push_device, concurrency: int):
+        """初始化推送管理器.
+
+        Args:
+            push_device: 异步推送函数，参数为 (device_id, device_data, on_attempt)，返回是否成功
+            concurrency: 同时推送的最大设备数
+        """
+        self.hass = hass
+        self._push_device = push_device
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._jobs = OrderedDict()
+
+    def get(self, job_id: str):
+        """获取推送任务."""
+        return self._jobs.get(job_id)
+
+    def start(self, apartment_id, sender_data: dict, skipped: list = ()) -> LayoutPushJob:
+        """创建并启动推送任务.
+
+        Args:
+            apartment_id: 户型ID
+            sender_data: 需要推送的设备数据 {device_id: device_data}
+            skipped: 离线而跳过推送的设备ID
+        """
+        job = LayoutPushJob(uuid.uuid4().hex, apartment_id, list(sender_data) + list(skipped))
+        for device_id in skipped:
+            job.devices[device_id]["status"] = PUSH_SKIPPED
+        self._jobs[job.job_id] = job
+        self._prune()
+
+        job.task = asyncio.create_task(self._run(job, sender_data))
+        return job
+
+    async def _run(self, job: LayoutPushJob, sender_data: dict) -> None:
+        """执行推送任务."""
+        for device_id in job.devices:
+            self._fire_progress(job, device_id)
+
+        await asyncio.gather(
+            *(self._push_one(job, device_id, device_data) for device_id, device_data in sender_data.items())
+        )
+        job.finished = int(time.time())
+        _LOGGER.debug("户型数据推送任务完成: %s", job.job_id)
+
+    async def _push_one(self, job: LayoutPushJob, device_id: str, device_data: dict) -> None:
+        """推送单个设备的数据."""
+        device = job.devices[device_id]
+
+        def on_attempt(attempt: int):
+            device["status"] = PUSH_SENDING
+            device["attempts"] = attempt
+            self._fire_progress(job, device_id)
+
+        async with self._semaphore:
+            try:
+                success = await self._push_device(device_id, device_data, on_attempt)
+            except Exception as e:
+                _LOGGER.debug("推送设备 %s 户型数据失败: %s", device_id, str(e))
+                success = False
+
+        device["status"] = PUSH_SUCCESS if success else PUSH_FAILED
+        self._fire_progress(job, device_id)
+
+    def _fire_progress(self, job: LayoutPushJob, device_id: str) -> None:
+        """发送单个设备的推送进度事件."""
+        device = job.devices[device_id]
+        self.hass.bus.async_fire(EVENT_PUSH_PROGRESS, {
+            "job_id": job.job_id,
+            "apartment_id": job.apartment_id,
+            "device_id": device_id,
+            "status": device["status"],
+            "attempts": device["attempts"],
+        })
+
+    def _prune(self) -> None:
+        """只保留最近结束的若干个任务."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:-MAX_FINISHED_JOBS]:
+            del self._jobs[job_id]
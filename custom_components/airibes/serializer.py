@@ -0,0 +1,44 @@
+"""JSON serialization for airibes.
+
+Uses orjson when it is installed and falls back to the standard library.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 为可选依赖
+    orjson = None
+
+# orjson.JSONDecodeError 是 json.JSONDecodeError 的子类，两种实现都可以用它捕获
+JSONDecodeError = json.JSONDecodeError
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def loads(data):
+        """解析 JSON，data 可以是 bytes 或 str."""
+        return orjson.loads(data)
+
+    def dumps(obj) -> str:
+        """序列化为紧凑的 JSON 字符串."""
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS).decode('utf-8')
+else:
+    def loads(data):
+        """解析 JSON，data 可以是 bytes 或 str."""
+        return json.loads(data)
+
+    def dumps(obj) -> str:
+        """序列化为紧凑的 JSON 字符串."""
+        return json.dumps(obj, separators=(',', ':'))
+
+
+def loads_embedded(value):
+    """解析嵌在人员位置（key 76、78）中的 JSON 字符串.
+
+    设备有时会多转义一层双引号，只有出现时才替换. 非字符串的值原样返回.
+    """
+    if not isinstance(value, str):
+        return value
+    if '\\"' in value:
+        value = value.replace('\\"', '"')
+    return loads(value)
@@ -0,0 +1,67 @@
+"""Last-known device state cache for airibes."""
+import time
+
+# params key -> 快照字段
+SNAPSHOT_FIELDS = {
+    "8": "level",       # 灵敏度
+    "13": "streaming",  # 人员位置推送开关
+    "16": "ap",         # AP 开关
+    "70": "learn",      # 自学习开关
+    "74": "version",    # 户型数据版本
+    "76": "positions",  # 人员位置（完整）
+    "78": "positions",  # 人员位置（增量）
+}
+
+
+class SnapshotCache:
+    """缓存设备最近上报的属性及其更新时间.
+
+    人员位置只记录更新时间，位置数据由目标表提供.
+    """
+
+    def __init__(self):
+        """初始化快照缓存."""
+        self._devices = {}  # device_id -> {field: (value, updated)}
+
+    def update(self, device_id: str, key: str, value) -> None:
+        """记录设备上报的属性."""
+        field = SNAPSHOT_FIELDS.get(key)
+        if field is None:
+            return
+        if field == "positions":
+            value = None
+        self._devices.setdefault(device_id, {})[field] = (value, time.monotonic())
+
+    def get(self, device_id: str) -> dict:
+        """获取设备缓存的属性值."""
+        fields = self._devices.get(device_id, {})
+        return {
+            field: value
+            for field, (value, _updated) in fields.items()
+            if field != "positions"
+        }
+
+    def stale_keys(self, device_id: str, keys: list, max_age: float) -> list:
+        """返回缓存不存在或超过 max_age 秒的 key.
+
+        Args:
+            keys: 需要检查的 params key，例如 [74, 76]
+        """
+        fields = self._devices.get(device_id, {})
+        deadline = time.monotonic() - max_age
+        stale = []
+        for key in keys:
+            cached = fields.get(SNAPSHOT_FIELDS.get(str(key)))
+            if cached is None or cached[1] < deadline:
+                stale.append(key)
+        return stale
+
+    def discard(self, device_id: str, key: str) -> None:
+        """清除设备某个属性的缓存（例如已下发修改，等待设备重新上报）."""
+        fields = self._devices.get(device_id)
+        if fields:
+            fields.pop(SNAPSHOT_FIELDS.get(key), None)
+
+    def remove(self, device_id: str) -> None:
+        """清除设备的缓存."""
+        self._devices.pop(device_id, None)
@@ -1,6 +1,5 @@
 """Storage manager for apartment data."""
 import os
-import json
 from homeassistant.helpers.entity_registry import async_get
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.components.websocket_api import (
@@ -8,7 +7,8 @@ from homeassistant.components.websocket_api import (
     websocket_command,
     async_response,
     ActiveConnection,
-    ERR_UNKNOWN_ERROR
+    ERR_UNKNOWN_ERROR,
+    event_message,
 )
 import voluptuous as vol
 from homeassistant.helpers.storage import Store
@@ -22,6 +22,9 @@ from .const import (
     EVENT_APARTMENT_VIEW_VISIBLE,
     IMPORTED_DEVICES_KEY
 )
+from .layout_index import compute_layout_version
+from .positions import diff_frames
+from .serializer import loads, dumps
 import asyncio
 from typing import List
 import time
@@ -56,7 +59,8 @@ class StorageManager:
             await asyncio.sleep(5)
             mqtt_client = self.hass.data[DOMAIN].get('mqtt_client')
             if mqtt_client:
-                await StorageManager._handle_device_visibility(self.hass, mqtt_client, 1, True)
+                # 启动时还没有前端查看，停止所有雷达的人员位置推送
+                await mqtt_client.async_reconcile_streaming()
             
             
         except Exception as e:
@@ -120,6 +124,26 @@ class StorageManager:
             self.hass,
             self.websocket_start_calibration
         )
+        async_register_command(
+            self.hass,
+            self.websocket_get_dispatch_stats
+        )
+        async_register_command(
+            self.hass,
+            self.websocket_get_push_job
+        )
+        async_register_command(
+            self.hass,
+            self.websocket_subscribe_positions
+        )
+        async_register_command(
+            self.hass,
+            self.websocket_get_occupancy
+        )
+        async_register_command(
+            self.hass,
+            self.websocket_get_trajectories
+        )
 
     @staticmethod
     @websocket_command({
@@ -158,6 +182,139 @@ class StorageManager:
                 f'Failed to start calibration: {str(e)}'
             )
 
+    @staticmethod
+    @websocket_command({
+        vol.Required('type'): 'airibes/get_dispatch_stats',
+        vol.Optional('reset', default=False): bool,
+    })
+    @callback
+    def websocket_get_dispatch_stats(hass: HomeAssistant, connection: ActiveConnection, msg: dict):
+        """获取 MQTT 消息分发统计."""
+        mqtt_client = hass.data[DOMAIN].get('mqtt_client')
+        if not mqtt_client:
+            connection.send_error(msg['id'], 'mqtt_not_ready', 'MQTT client is not ready')
+            return
+
+        connection.send_result(msg['id'], mqtt_client.get_dispatch_stats())
+        if msg.get('reset'):
+            mqtt_client.reset_dispatch_stats()
+
+    @staticmethod
+    @websocket_command({
+        vol.Required('type'): 'airibes/get_push_job',
+        vol.Required('job_id'): str,
+    })
+    @callback
+    def websocket_get_push_job(hass: HomeAssistant, connection: ActiveConnection, msg: dict):
+        """获取户型数据推送任务进度."""
+        mqtt_client = hass.data[DOMAIN].get('mqtt_client')
+        if not mqtt_client:
+            connection.send_error(msg['id'], 'mqtt_not_ready', 'MQTT client is not ready')
+            return
+
+        job = mqtt_client.push_jobs.get(msg['job_id'])
+        if not job:
+            connection.send_error(msg['id'], 'not_found', f"推送任务 {msg['job_id']} 不存在")
+            return
+
+        connection.send_result(msg['id'], job.as_dict())
+
+    @staticmethod
+    @websocket_command({
+        vol.Required('type'): 'airibes/subscribe_positions',
+        vol.Required('apartment_id'): int,
+        vol.Optional('delta', default=False): bool,
+    })
+    @callback
+    def websocket_subscribe_positions(hass: HomeAssistant, connection: ActiveConnection, msg: dict):
+        """订阅户型的人员位置，连接断开时自动取消订阅.
+
+        首帧为完整数据并附带各雷达最近已知的状态，开启 delta 后续帧只包含变化的目标.
+        订阅期间户型中的雷达保持推送人员位置.
+        """
+        mqtt_client = hass.data[DOMAIN].get('mqtt_client')
+        if not mqtt_client:
+            connection.send_error(msg['id'], 'mqtt_not_ready', 'MQTT client is not ready')
+            return
+
+        apartment_id = msg['apartment_id']
+        delta = msg['delta']
+        last_frame = mqtt_client.positions.get_frame(apartment_id)
+
+        @callback
+        def forward_positions(frame: dict) -> None:
+            nonlocal last_frame
+            if delta:
+                message = {"apartment_id": apartment_id, "full": False, **diff_frames(last_frame, frame)}
+            else:
+                message = {"apartment_id": apartment_id, "full": True, "devices": frame}
+            last_frame = frame
+            connection.send_message(event_message(msg['id'], message))
+
+        unsub_positions = mqtt_client.positions.async_subscribe(apartment_id, forward_positions)
+        # 订阅者同时是户型的查看者
+        release_viewer = mqtt_client.viewers.async_add(apartment_id)
+
+        @callback
+        def unsubscribe() -> None:
+            unsub_positions()
+            release_viewer()
+
+        connection.subscriptions[msg['id']] = unsubscribe
+        connection.send_result(msg['id'])
+        connection.send_message(event_message(msg['id'], {
+            "apartment_id": apartment_id,
+            "full": True,
+            "devices": last_frame,
+            "snapshot": mqtt_client.get_apartment_snapshot(apartment_id),
+        }))
+
+    @staticmethod
+    @websocket_command({
+        vol.Required('type'): 'airibes/get_occupancy',
+        vol.Required('apartment_id'): int,
+    })
+    @callback
+    def websocket_get_occupancy(hass: HomeAssistant, connection: ActiveConnection, msg: dict):
+        """获取户型中每个房间和区域的人数."""
+        mqtt_client = hass.data[DOMAIN].get('mqtt_client')
+        if not mqtt_client:
+            connection.send_error(msg['id'], 'mqtt_not_ready', 'MQTT client is not ready')
+            return
+
+        connection.send_result(msg['id'], mqtt_client.occupancy.get_counts(msg['apartment_id']))
+
+    @staticmethod
+    @websocket_command({
+        vol.Required('type'): 'airibes/get_trajectories',
+        vol.Required('apartment_id'): int,
+        vol.Required('start'): vol.Coerce(float),
+        vol.Required('end'): vol.Coerce(float),
+        vol.Optional('downsample', default=0): vol.Coerce(float),
+    })
+    @async_response
+    async def websocket_get_trajectories(hass: HomeAssistant, connection: ActiveConnection, msg: dict):
+        """获取户型在时间范围内的人员轨迹.
+
+        start/end 为时间戳（秒），downsample 为降采样间隔（秒），
+        返回的每条记录为 [时间戳, 融合ID, x, y]，坐标单位为厘米.
+        """
+        mqtt_client = hass.data[DOMAIN].get('mqtt_client')
+        if not mqtt_client:
+            connection.send_error(msg['id'], 'mqtt_not_ready', 'MQTT client is not ready')
+            return
+
+        try:
+            records = await mqtt_client.async_get_trajectories(
+                msg['apartment_id'], msg['start'], msg['end'], msg['downsample']
+            )
+            connection.send_result(msg['id'], {
+                "apartment_id": msg['apartment_id'],
+                "records": records,
+            })
+        except Exception as e:
+            connection.send_error(msg['id'], 'load_failed', str(e))
+
     @staticmethod
     @websocket_command({
         vol.Required('type'): 'airibes/get_apartments'
@@ -245,16 +402,28 @@ class StorageManager:
             # 处理 senderData
             if sender_data:
                 # 记录发送数据结构
-                _LOGGER.debug("房间数据结构: %s", json.dumps(sender_data, indent=2))
+                _LOGGER.debug("房间数据结构: %s", dumps(sender_data))
 
-                # 保存到单独的存储
+                # 使用内容哈希作为版本号，只推送内容发生变化的设备
                 sender_store = Store(hass, STORAGE_VERSION, f"{storage_key}_sender")
+                previous_data = await sender_store.async_load() or {}
+                changed_data = {}
+                for device_id, device_data in sender_data.items():
+                    device_data['version'] = compute_layout_version(apartment_id, device_data)
+                    if previous_data.get(device_id, {}).get('version') != device_data['version']:
+                        changed_data[device_id] = device_data
+
+                # 保存到单独的存储
                 await sender_store.async_save(sender_data)
 
                 # 通过 MQTT 客户端发送数据
                 mqtt_client = hass.data[DOMAIN].get('mqtt_client')
                 if mqtt_client:
-                    await mqtt_client.send_apartment_data(sender_data)
+                    # 更新设备布局索引
+                    await mqtt_client.layout_index.async_update_apartment(apartment_id, sender_data)
+                    job = mqtt_client.send_apartment_data(changed_data, apartment_id)
+                    connection.send_result(msg["id"], {"job_id": job.job_id})
+                    return
 
             connection.send_result(msg["id"])
 
@@ -281,8 +450,8 @@ class StorageManager:
                 old_storage_path = os.path.join(hass.config.path('custom_storage'), 'apartment_layout.json')
                 if os.path.exists(old_storage_path):
                     try:
-                        with open(old_storage_path, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
+                        with open(old_storage_path, 'rb') as f:
+                            data = loads(f.read())
                         # 保存到新的存储位
                         await store.async_save(data)
                     except Exception as e:
@@ -347,56 +516,23 @@ class StorageManager:
         vol.Required('visible'): bool,
         vol.Required('apartment_id'): int,
     })
-    @async_response
-    async def websocket_set_apartment_view_visible(hass: HomeAssistant, connection: ActiveConnection, msg: dict):
-        """设置户型视图可见性."""
-        try:
-            visible = msg['visible']
-            apartment_id = msg['apartment_id']
-            
-            mqtt_client = hass.data[DOMAIN].get('mqtt_client')
-            if not mqtt_client:
-                raise Exception("MQTT客户端未初始化")
-
-            await StorageManager._handle_device_visibility(hass, mqtt_client, apartment_id, visible)
-            connection.send_result(msg['id'])
-            
-        except Exception as e:
-            connection.send_error(msg['id'], 'set_visible_failed', str(e))
-
-    @staticmethod
-    async def _handle_device_visibility(hass: HomeAssistant, mqtt_client, apartment_id: int, visible: bool):
-        """处理设备可见性和状态."""
-        mqtt_client.set_apartment_view_visible(apartment_id, visible)
-
-        # 获取所有雷达设备
-        radar_store = Store(hass, STORAGE_VERSION, RADAR_STORAGE_KEY)
-        stored_devices = await radar_store.async_load() or {}
-        if visible:
-            # 当visible为true时，加载户型数据
-            apartment_store = Store(hass, STORAGE_VERSION, f"{APARTMENT_DATA_KEY}_{apartment_id}")
-            apartment_data = await apartment_store.async_load()
-            
-            if apartment_data:
-                rooms = apartment_data.get('rooms', [])
-                # 获取所有在房间中的设备ID
-                devices_in_rooms = set()
-                for room in rooms:
-                    if room.get('devices'):
-                        devices_in_rooms.update(device_id.upper() for device_id in room['devices'])
-                
-                # 遍历所有雷达设备
-                for device_id in stored_devices:
-                    if device_id in devices_in_rooms:
-                        # 如果设备在房间中，发送开启命令
-                        await mqtt_client.send_start_cmd(device_id)
-                    else:
-                        # 如果设备不在房间中，发送停止命令
-                        await mqtt_client.send_stop_cmd(device_id)
+    @callback
+    def websocket_set_apartment_view_visible(hass: HomeAssistant, connection: ActiveConnection, msg: dict):
+        """设置户型视图可见性.
+
+        按连接统计查看者，连接断开时自动移除该连接的查看者.
+        """
+        mqtt_client = hass.data[DOMAIN].get('mqtt_client')
+        if not mqtt_client:
+            connection.send_error(msg['id'], 'set_visible_failed', "MQTT客户端未初始化")
+            return
+
+        apartment_id = msg['apartment_id']
+        if msg['visible']:
+            connection.subscriptions[msg['id']] = mqtt_client.viewers.async_add(apartment_id, connection)
         else:
-            # 当visible为false时，停止所有雷达设备
-            for device_id in stored_devices:
-                await mqtt_client.send_stop_cmd(device_id)
+            mqtt_client.viewers.async_remove(apartment_id, connection)
+        connection.send_result(msg['id'])
 
     @staticmethod
     @websocket_command({
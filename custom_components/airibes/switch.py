@@ -159,19 +159,15 @@ class RadarAPSwitch(SwitchEntity):
             del self.hass.data[DOMAIN]["switches"][self._device_id]
 
     async def async_turn_on(self, **kwargs) -> None:
-        """Turn on the switch."""
-        device_state = self.hass.states.get(f"sensor.{DOMAIN}_radar_{self._device_id}") 
-        if device_state and device_state.state == get_translation_key("entity.sensor.airibes.state.online"):
-            self._is_on = True
-            await sender_ap_cmd(self.hass, self._device_id, True)
+        """Turn on the switch (queued until reconnect while the device is offline)."""
+        self._is_on = True
+        await sender_ap_cmd(self.hass, self._device_id, True)
 
 
     async def async_turn_off(self, **kwargs) -> None:
-        """Turn off the switch."""
-        device_state = self.hass.states.get(f"sensor.{DOMAIN}_radar_{self._device_id}") 
-        if device_state and device_state.state == get_translation_key("entity.sensor.airibes.state.online"):
-            self._is_on = False
-            await sender_ap_cmd(self.hass, self._device_id, False)
+        """Turn off the switch (queued until reconnect while the device is offline)."""
+        self._is_on = False
+        await sender_ap_cmd(self.hass, self._device_id, False)
 
 class RadarLearnSwitch(SwitchEntity):
     """Radar Self-Learning Switch Entity."""
@@ -236,20 +232,16 @@ class RadarLearnSwitch(SwitchEntity):
             del self.hass.data[DOMAIN]["switches"][f"{self._device_id}_learn"]
 
     async def async_turn_on(self, **kwargs) -> None:
-        """Turn on the switch."""
-        device_state = self.hass.states.get(f"sensor.{DOMAIN}_radar_{self._device_id}")
-        if device_state and device_state.state == get_translation_key("entity.sensor.airibes.state.online"):
-            self._is_on = True
-            # Send self-learning command
-            await sender_learn_cmd(self.hass, self._device_id, True)
+        """Turn on the switch (queued until reconnect while the device is offline)."""
+        self._is_on = True
+        # Send self-learning command
+        await sender_learn_cmd(self.hass, self._device_id, True)
 
     async def async_turn_off(self, **kwargs) -> None:
-        """Turn off the switch."""
-        device_state = self.hass.states.get(f"sensor.{DOMAIN}_radar_{self._device_id}") 
-        if device_state and device_state.state == get_translation_key("entity.sensor.airibes.state.online"):
-            self._is_on = False
-            # Send stop self-learning command
-            await sender_learn_cmd(self.hass, self._device_id, False)
+        """Turn off the switch (queued until reconnect while the device is offline)."""
+        self._is_on = False
+        # Send stop self-learning command
+        await sender_learn_cmd(self.hass, self._device_id, False)
 
 
 
@@ -0,0 +1,111 @@
+"""Per-device person target table for airibes."""
+import logging
+import time
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Target:
+    """单个人员目标（坐标单位：厘米）."""
+
+    __slots__ = ("x", "y", "last_update")
+
+    def __init__(self, x: float, y: float, last_update: float):
+        """初始化目标."""
+        self.x = x
+        self.y = y
+        self.last_update = last_update
+
+
+class TargetTable:
+    """按设备和目标ID保存人员目标，超过 TTL 未更新的目标会被移除."""
+
+    def __init__(self, hass: HomeAssistant, on_expire, ttl: float):
+        """初始化目标表.
+
+        Args:
+            on_expire: 设备有目标过期时调用，参数为 device_id
+            ttl: 目标最长保留时间（秒）
+        """
+        self.hass = hass
+        self._on_expire = on_expire
+        self._ttl = ttl
+        self._devices = {}  # device_id -> {target_id: Target}
+        self._unsub = None
+
+    def async_start(self) -> None:
+        """启动过期检查，间隔为 1 秒（TTL 较短时为半个 TTL）."""
+        if self._unsub is None:
+            self._unsub = async_track_time_interval(
+                self.hass, self._async_expire, timedelta(seconds=min(self._ttl / 2, 1))
+            )
+
+    def async_stop(self) -> None:
+        """停止过期检查."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+
+    def replace(self, device_id: str, positions) -> None:
+        """用完整的目标列表替换设备的所有目标.
+
+        Args:
+            positions: 可迭代的 (target_id, x, y)
+        """
+        now = time.monotonic()
+        self._devices[device_id] = {
+            target_id: Target(x, y, now) for target_id, x, y in positions
+        }
+
+    def update(self, device_id: str, positions) -> None:
+        """更新或新增设备的部分目标.
+
+        Args:
+            positions: 可迭代的 (target_id, x, y)
+        """
+        now = time.monotonic()
+        targets = self._devices.setdefault(device_id, {})
+        for target_id, x, y in positions:
+            target = targets.get(target_id)
+            if target is None:
+                targets[target_id] = Target(x, y, now)
+            else:
+                target.x = x
+                target.y = y
+                target.last_update = now
+
+    def clear(self, device_id: str) -> None:
+        """清空设备的所有目标."""
+        self._devices.pop(device_id, None)
+
+    def get(self, device_id: str) -> list:
+        """获取设备当前的目标列表."""
+        targets = self._devices.get(device_id)
+        if not targets:
+            return []
+        return [
+            {"id": target_id, "x": target.x, "y": target.y}
+            for target_id, target in targets.items()
+        ]
+
+    @callback
+    def _async_expire(self, _now=None) -> None:
+        """移除超过 TTL 未更新的目标."""
+        deadline = time.monotonic() - self._ttl
+        for device_id, targets in list(self._devices.items()):
+            expired = [
+                target_id for target_id, target in targets.items()
+                if target.last_update < deadline
+            ]
+            if not expired:
+                continue
+            for target_id in expired:
+                del targets[target_id]
+            if not targets:
+                del self._devices[device_id]
+            _LOGGER.debug("设备 %s 的目标 %s 已过期", device_id, expired)
+            self._on_expire(device_id)
@@ -0,0 +1,218 @@
+"""On-disk person trajectory log for airibes."""
+import asyncio
+import calendar
+import logging
+import mmap
+import os
+import shutil
+import struct
+import time
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+_LOGGER = logging.getLogger(__name__)
+
+# 每条记录: 时间戳（秒）、融合ID、x、y（厘米），小端定长 20 字节
+RECORD = struct.Struct('<dIff')
+SEGMENT_SECONDS = 3600
+SEGMENT_SUFFIX = '.bin'
+_SEGMENT_FORMAT = '%Y%m%d%H'
+
+
+def segment_name(hour: int) -> str:
+    """获取小时分段的文件名（UTC）."""
+    return time.strftime(_SEGMENT_FORMAT, time.gmtime(hour * SEGMENT_SECONDS)) + SEGMENT_SUFFIX
+
+
+def segment_hour(name: str):
+    """从分段文件名解析小时，不是分段文件时返回 None."""
+    if not name.endswith(SEGMENT_SUFFIX):
+        return None
+    try:
+        parsed = time.strptime(name[:-len(SEGMENT_SUFFIX)], _SEGMENT_FORMAT)
+    except ValueError:
+        return None
+    return calendar.timegm(parsed) // SEGMENT_SECONDS
+
+
+def _bisect(view, count: int, timestamp: float, right: bool = False) -> int:
+    """在按时间排序的记录中二分查找.
+
+    Returns:
+        int: 第一条时间戳不小于（right 为 True 时大于）timestamp 的记录下标
+    """
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        value = RECORD.unpack_from(view, middle * RECORD.size)[0]
+        if value < timestamp or (right and value == timestamp):
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def read_segment(path: str, start: float, end: float) -> list:
+    """通过内存映射读取分段中 [start, end] 时间范围内的记录."""
+    size = os.path.getsize(path)
+    # 进程中断时可能留下不完整的记录，忽略末尾多余的字节
+    count = size // RECORD.size
+    if not count:
+        return []
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        first = _bisect(view, count, start)
+        last = _bisect(view, count, end, right=True)
+        return [
+            RECORD.unpack_from(view, index * RECORD.size)
+            for index in range(first, last)
+        ]
+
+
+def downsample_records(records: list, interval: float) -> list:
+    """每个融合目标在每个时间间隔内只保留第一条记录."""
+    if interval <= 0:
+        return records
+    seen = set()
+    result = []
+    for record in records:
+        bucket = (record[1], int(record[0] // interval))
+        if bucket not in seen:
+            seen.add(bucket)
+            result.append(record)
+    return result
+
+
+class TrajectoryLog:
+    """按户型保存人员轨迹.
+
+    位置帧先在内存中打包，定时在线程池中追加写入按小时分段的定长二进制文件:
+    {base_dir}/{户型ID}/{YYYYMMDDHH}.bin. 查询时通过内存映射二分查找时间范围，
+    超过保留时间的分段在写入时删除.
+    """
+
+    def __init__(self, hass: HomeAssistant, base_dir: str, retention_hours: int, flush_interval: float):
+        """初始化轨迹日志.
+
+        Args:
+            base_dir: 轨迹文件根目录
+            retention_hours: 分段保留的小时数
+            flush_interval: 写入文件的间隔（秒）
+        """
+        self.hass = hass
+        self._base_dir = base_dir
+        self._retention_hours = retention_hours
+        self._flush_interval = flush_interval
+        self._pending = {}  # (apartment_id, hour) -> bytearray
+        self._pruned_hour = None
+        self._lock = asyncio.Lock()  # 按顺序追加写入，保证分段内记录按时间排序
+        self._unsub = None
+
+    def async_start(self) -> None:
+        """启动定时写入."""
+        if self._unsub is None:
+            self._unsub = async_track_time_interval(
+                self.hass, self._async_flush_interval, timedelta(seconds=self._flush_interval)
+            )
+
+    async def async_stop(self) -> None:
+        """停止定时写入并写入剩余的记录."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        await self.async_flush()
+
+    @callback
+    def record(self, apartment_id, frame: dict) -> None:
+        """记录户型一帧融合后的人员位置，只有超过死区的变化才会产生新帧.
+
+        Args:
+            frame: {device_id: [{"id", "x", "y", "track"}]}，坐标单位为厘米
+        """
+        timestamp = time.time()
+        hour = int(timestamp // SEGMENT_SECONDS)
+        buffer = None
+        for positions in frame.values():
+            for pos in positions:
+                if buffer is None:
+                    buffer = self._pending.setdefault((apartment_id, hour), bytearray())
+                buffer += RECORD.pack(timestamp, pos["track"], pos["x"], pos["y"])
+
+    async def async_flush(self) -> None:
+        """在线程池中写入待写入的记录，并删除过期的分段."""
+        async with self._lock:
+            pending, self._pending = self._pending, {}
+            hour = int(time.time() // SEGMENT_SECONDS)
+            prune = self._pruned_hour != hour
+            if not pending and not prune:
+                return
+            self._pruned_hour = hour
+            try:
+                await self.hass.async_add_executor_job(
+                    self._write, pending, hour - self._retention_hours if prune else None
+                )
+            except OSError as e:
+                _LOGGER.error("写入人员轨迹失败: %s", str(e))
+
+    async def async_query(self, apartment_id, start: float, end: float, downsample: float = 0) -> list:
+        """查询户型在时间范围内的轨迹.
+
+        Args:
+            start: 开始时间戳（秒）
+            end: 结束时间戳（秒）
+            downsample: 降采样间隔（秒），每个融合目标在每个间隔内只返回一条记录
+
+        Returns:
+            list: [(时间戳, 融合ID, x, y)]，按时间排序
+        """
+        # 先写入内存中的记录，保证能查到最新的位置
+        await self.async_flush()
+        return await self.hass.async_add_executor_job(
+            self._read, apartment_id, start, end, downsample
+        )
+
+    async def _async_flush_interval(self, _now=None) -> None:
+        """定时写入."""
+        await self.async_flush()
+
+    def _apartment_dir(self, apartment_id) -> str:
+        """获取户型的轨迹目录."""
+        return os.path.join(self._base_dir, str(apartment_id))
+
+    def _write(self, pending: dict, prune_before) -> None:
+        """追加写入记录并删除过期分段（在线程池中执行）."""
+        for (apartment_id, hour), buffer in pending.items():
+            directory = self._apartment_dir(apartment_id)
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, segment_name(hour)), 'ab') as file:
+                file.write(buffer)
+
+        if prune_before is None or not os.path.isdir(self._base_dir):
+            return
+        for apartment in os.listdir(self._base_dir):
+            directory = os.path.join(self._base_dir, apartment)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                hour = segment_hour(name)
+                if hour is not None and hour < prune_before:
+                    os.remove(os.path.join(directory, name))
+            if not os.listdir(directory):
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def _read(self, apartment_id, start: float, end: float, downsample: float) -> list:
+        """读取时间范围内的记录（在线程池中执行）."""
+        directory = self._apartment_dir(apartment_id)
+        if not os.path.isdir(directory) or end < start:
+            return []
+        first_hour = int(start // SEGMENT_SECONDS)
+        last_hour = int(end // SEGMENT_SECONDS)
+        segments = sorted(
+            (hour, name) for name in os.listdir(directory)
+            if (hour := segment_hour(name)) is not None and first_hour <= hour <= last_hour
+        )
+        records = []
+        for _hour, name in segments:
+            records.extend(read_segment(os.path.join(directory, name), start, end))
+        return downsample_records(records, downsample)
@@ -0,0 +1,111 @@
+"""Radar to apartment coordinate transforms for airibes."""
+import math
+from typing import NamedTuple
+
+# 雷达上报的坐标单位为米，户型坐标单位为厘米
+METERS_TO_CM = 100
+MM_TO_CM = 0.1
+
+# 安装角度（installAngle）为倒装时，雷达左右方向相反
+MIRRORED_INSTALL_ANGLES = frozenset({1})
+
+
+class Transform(NamedTuple):
+    """二维仿射变换: x' = a*x + b*y + tx, y' = c*x + d*y + ty."""
+
+    a: float
+    b: float
+    c: float
+    d: float
+    tx: float
+    ty: float
+
+
+# 雷达直接上报户型坐标时只需要米转厘米
+SCALE_ONLY = Transform(METERS_TO_CM, 0, 0, METERS_TO_CM, 0, 0)
+
+
+def build_transform(device_info: dict, radar_local: bool) -> Transform:
+    """根据 sender_data 中的雷达位姿生成坐标变换.
+
+    Args:
+        device_info: 单个设备的 sender_data
+        radar_local: 雷达上报的是否为自身坐标系（x 为横向，y 为朝向方向的距离）
+
+    Returns:
+        Transform: 雷达上报坐标（米）到户型坐标（厘米）的变换
+    """
+    radar = device_info.get('radar')
+    if not radar_local or not radar:
+        return SCALE_ONLY
+
+    position = radar.get('position') or {}
+    # angle 为雷达朝向在户型坐标系中的角度（度），-90 为朝上
+    theta = math.radians(radar.get('angle', -90))
+    cos, sin = math.cos(theta), math.sin(theta)
+    lateral = -1 if radar.get('installAngle') in MIRRORED_INSTALL_ANGLES else 1
+
+    # 横向单位向量 (-sin, cos)，朝向单位向量 (cos, sin)
+    return Transform(
+        -sin * lateral * METERS_TO_CM,
+        cos * METERS_TO_CM,
+        cos * lateral * METERS_TO_CM,
+        sin * METERS_TO_CM,
+        position.get('x', 0) * MM_TO_CM,
+        position.get('y', 0) * MM_TO_CM,
+    )
+
+
+def apply_transform(transform: Transform, positions) -> list:
+    """将一帧人员位置批量变换到户型坐标.
+
+    Args:
+        positions: [{"id", "x", "y"}]，雷达上报的坐标（米）
+
+    Returns:
+        list: [(id, x, y)]，户型坐标（厘米）
+    """
+    a, b, c, d, tx, ty = transform
+    if b == 0 and c == 0 and tx == 0 and ty == 0:
+        return [(pos["id"], pos["x"] * a, pos["y"] * d) for pos in positions]
+    targets = []
+    for pos in positions:
+        x, y = pos["x"], pos["y"]
+        targets.append((pos["id"], a * x + b * y + tx, c * x + d * y + ty))
+    return targets
+
+
+class TransformTable:
+    """按设备缓存坐标变换，户型布局变化时重新计算."""
+
+    def __init__(self, radar_local: bool):
+        """初始化变换表.
+
+        Args:
+            radar_local: 雷达上报的是否为自身坐标系
+        """
+        self._radar_local = radar_local
+        self._apartments = {}  # apartment_id -> {device_id: Transform}
+        self._devices = {}     # device_id -> Transform
+
+    def get(self, device_id: str) -> Transform:
+        """获取设备的坐标变换，未知设备只做单位换算."""
+        return self._devices.get(device_id, SCALE_ONLY)
+
+    def rebuild(self, apartment_id, sender_data: dict) -> None:
+        """根据户型的 sender_data 重新计算该户型所有设备的变换."""
+        transforms = {
+            device_id: build_transform(device_info, self._radar_local)
+            for device_id, device_info in (sender_data or {}).items()
+        }
+        if transforms:
+            self._apartments[apartment_id] = transforms
+        else:
+            self._apartments.pop(apartment_id, None)
+
+        devices = {}
+        for apartment_transforms in self._apartments.values():
+            for device_id, transform in apartment_transforms.items():
+                # 同一设备出现在多个户型时，以先出现的户型为准（与布局索引一致）
+                devices.setdefault(device_id, transform)
+        self._devices = devices
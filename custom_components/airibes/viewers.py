@@ -0,0 +1,115 @@
+"""Per-apartment viewer tracking for airibes."""
+import logging
+from functools import partial
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ViewerRegistry:
+    """按户型统计正在查看的前端数量.
+
+    第一个查看者出现时开始推送，最后一个查看者离开后等待宽限期再停止，
+    避免刷新页面或切换标签时反复开关雷达.
+    """
+
+    def __init__(self, hass: HomeAssistant, on_start, on_stop, grace_period: float):
+        """初始化查看者统计.
+
+        Args:
+            on_start: 户型开始被查看时调用，参数为 apartment_id
+            on_stop: 户型不再被查看时调用，参数为 apartment_id
+            grace_period: 最后一个查看者离开后延迟停止的时间（秒）
+        """
+        self.hass = hass
+        self._on_start = on_start
+        self._on_stop = on_stop
+        self._grace_period = grace_period
+        self._counts = {}       # apartment_id -> 查看者数量
+        self._watched = set()   # 正在推送的户型（包括宽限期内的户型）
+        self._stop_timers = {}  # apartment_id -> 取消延迟停止的函数
+        self._owned = {}        # (owner, apartment_id) -> [release]
+
+    def is_watched(self, apartment_id) -> bool:
+        """户型是否正在被查看（包括宽限期）."""
+        return apartment_id in self._watched
+
+    def get_counts(self) -> dict:
+        """获取各户型的查看者数量."""
+        return dict(self._counts)
+
+    @callback
+    def async_add(self, apartment_id, owner=None):
+        """增加一个查看者.
+
+        Args:
+            owner: 查看者所属的对象（例如 websocket 连接），用于 async_remove 按所属对象移除
+
+        Returns:
+            移除该查看者的函数，重复调用无效
+        """
+        self._counts[apartment_id] = self._counts.get(apartment_id, 0) + 1
+        cancel_stop = self._stop_timers.pop(apartment_id, None)
+        if cancel_stop is not None:
+            cancel_stop()
+        if apartment_id not in self._watched:
+            self._watched.add(apartment_id)
+            _LOGGER.debug("户型 %s 开始被查看", apartment_id)
+            self._on_start(apartment_id)
+
+        released = False
+
+        @callback
+        def release() -> None:
+            nonlocal released
+            if released:
+                return
+            released = True
+            if owner is not None:
+                owned = self._owned.get((owner, apartment_id))
+                if owned and release in owned:
+                    owned.remove(release)
+                    if not owned:
+                        del self._owned[(owner, apartment_id)]
+            self._async_release(apartment_id)
+
+        if owner is not None:
+            self._owned.setdefault((owner, apartment_id), []).append(release)
+        return release
+
+    @callback
+    def async_remove(self, apartment_id, owner) -> None:
+        """移除所属对象最早添加的一个查看者."""
+        owned = self._owned.get((owner, apartment_id))
+        if owned:
+            owned[0]()
+
+    @callback
+    def _async_release(self, apartment_id) -> None:
+        """减少一个查看者，没有查看者后延迟停止."""
+        count = self._counts.get(apartment_id, 0) - 1
+        if count > 0:
+            self._counts[apartment_id] = count
+            return
+        self._counts.pop(apartment_id, None)
+        self._stop_timers[apartment_id] = async_call_later(
+            self.hass, self._grace_period, partial(self._async_stop_watching, apartment_id)
+        )
+
+    @callback
+    def _async_stop_watching(self, apartment_id, _now=None) -> None:
+        """宽限期结束后停止推送."""
+        self._stop_timers.pop(apartment_id, None)
+        if self._counts.get(apartment_id):
+            return
+        self._watched.discard(apartment_id)
+        _LOGGER.debug("户型 %s 已无查看者", apartment_id)
+        self._on_stop(apartment_id)
+
+    def async_stop(self) -> None:
+        """取消所有延迟停止."""
+        for cancel_stop in self._stop_timers.values():
+            cancel_stop()
+        self._stop_timers.clear()
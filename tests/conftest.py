@@ -0,0 +1,55 @@
+"""Fixtures for airibes tests.
+
+Requires pytest-homeassistant-custom-component.
+"""
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.airibes.const import DOMAIN
+from custom_components.airibes.crypto_utils import codec
+from custom_components.airibes.mqtt_client import MqttClient
+from custom_components.airibes.serializer import dumps
+
+DEVICE_ID = "AABBCCDDEEFF"
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """允许加载 custom_components 中的集成."""
+    yield
+
+
+def upward_message(client: MqttClient, device_id: str, params: list, msg_id: int = 1):
+    """构造设备上行的 cmd 2006 MQTT 消息."""
+    payload = {
+        "cmd": 2006,
+        "dir": "10",
+        "msgId": msg_id,
+        "prio": 2,
+        "ver": "2.3",
+        "timestamp": 1700000000000,
+        "data": codec.encrypt(dumps({"params": params})),
+    }
+    return SimpleNamespace(
+        topic=f"{client.base_topic}/{device_id}/upward",
+        payload=dumps(payload).encode(),
+    )
+
+
+@pytest.fixture
+async def mqtt_client(hass):
+    """未连接 MQTT 的客户端，发送的消息记录在 client.published 中."""
+    hass.data.setdefault(DOMAIN, {})
+    client = MqttClient(hass)
+    client._register_handlers()
+    client.published = []
+
+    async def publish(device_id: str, payload: str):
+        client.published.append((device_id, payload))
+        return True
+
+    with patch.object(client, "async_publish", side_effect=publish):
+        yield client
+    await client.async_stop()
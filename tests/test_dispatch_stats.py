@@ -0,0 +1,34 @@
+"""Tests for dispatch statistics."""
+import asyncio
+
+from custom_components.airibes.dispatcher import UNHANDLED
+
+from .conftest import DEVICE_ID, upward_message
+
+
+async def test_reset_clears_every_section(mqtt_client):
+    """未注册的键单独计数，重置清空所有统计."""
+    await mqtt_client._message_received(upward_message(mqtt_client, DEVICE_ID, [{"999": 1}]))
+    for _ in range(100):
+        if mqtt_client.get_dispatch_stats()["params"][UNHANDLED]["hits"]:
+            break
+        await asyncio.sleep(0)
+
+    stats = mqtt_client.get_dispatch_stats()
+    assert stats["params"][UNHANDLED]["hits"] == 1
+    assert "999" not in stats["params"]
+
+    # 等待回复超时产生请求统计
+    try:
+        await mqtt_client.async_request_properties(DEVICE_ID, {"params": [{"6": ""}]}, "6", timeout=0)
+    except asyncio.TimeoutError:
+        pass
+    mqtt_client._ingest._queues[DEVICE_ID].dropped = 3
+    assert mqtt_client.get_dispatch_stats()["requests"]
+
+    mqtt_client.reset_dispatch_stats()
+    stats = mqtt_client.get_dispatch_stats()
+    assert stats["params"][UNHANDLED]["hits"] == 0
+    assert stats["cmd"]["2006"]["hits"] == 0
+    assert stats["ingest"][DEVICE_ID]["dropped"] == 0
+    assert stats["requests"] == {}
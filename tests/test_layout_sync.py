@@ -0,0 +1,45 @@
+"""Tests for layout version sync on key 74 reports."""
+import asyncio
+
+from custom_components.airibes.layout_index import compute_layout_version
+
+from .conftest import DEVICE_ID, upward_message
+
+APARTMENT_ID = 1
+
+
+async def test_sync_does_not_block_device_queue(hass, mqtt_client):
+    """版本过期触发的推送在后台执行，同一设备的 key 74 回复能被及时处理."""
+    device_data = {"room_id": 1, "radar": {"position": {"x": 0, "y": 0, "z": 1600}}}
+    device_data["version"] = compute_layout_version(APARTMENT_ID, device_data)
+    mqtt_client.layout_index._apartments = {APARTMENT_ID: {DEVICE_ID: device_data}}
+    mqtt_client.layout_index._reindex()
+
+    pushes = []
+    original_publish = mqtt_client.async_publish.side_effect
+
+    async def publish(device_id, payload):
+        # 推送户型数据后设备立即回复新版本
+        if mqtt_client._requests.has_pending(device_id, '74'):
+            pushes.append(payload)
+            hass.async_create_task(mqtt_client._message_received(
+                upward_message(mqtt_client, device_id, [{"74": device_data["version"]}])
+            ))
+        return await original_publish(device_id, payload)
+
+    mqtt_client.async_publish.side_effect = publish
+
+    # 设备上报旧版本
+    await mqtt_client._message_received(
+        upward_message(mqtt_client, DEVICE_ID, [{"74": f"HASS_old_{APARTMENT_ID}"}])
+    )
+    for _ in range(100):
+        if DEVICE_ID in mqtt_client._sync_tasks:
+            break
+        await asyncio.sleep(0)
+    task = mqtt_client._sync_tasks[DEVICE_ID]
+
+    # 回复在推送进行中到达，推送只发送一次且不等待超时
+    await asyncio.wait_for(task, 5)
+    assert len(pushes) == 1
+    assert not mqtt_client._requests.has_pending(DEVICE_ID, '74')
@@ -0,0 +1,38 @@
+"""Tests for position-derived occupancy."""
+from custom_components.airibes.binary_sensor import RoomBinarySensor
+from custom_components.airibes.const import DOMAIN
+from custom_components.airibes.occupancy import OccupancyEngine
+
+from .conftest import DEVICE_ID
+
+SENDER_DATA = {
+    DEVICE_ID: {
+        "room_id": 3,
+        "roomRegion": [{"x": 0, "y": 0}, {"x": 4000, "y": 3000}],
+    },
+}
+
+
+async def test_position_count_does_not_override_radar_state(hass):
+    """人员位置与雷达上报的房间状态取或，两者互不覆盖."""
+    hass.data.setdefault(DOMAIN, {})
+    sensor = RoomBinarySensor(hass, "3", "Room", 1)
+    await sensor.async_added_to_hass()
+    engine = OccupancyEngine(hass, 1000)
+    engine.rebuild(1, SENDER_DATA)
+
+    # 雷达上报有人，位置帧中没有目标
+    sensor.set_state(True)
+    engine.update(1, {DEVICE_ID: []})
+    assert sensor.is_on
+
+    # 雷达上报无人，位置帧中有两个目标
+    sensor.set_state(False)
+    engine.update(1, {DEVICE_ID: [{"id": 1, "x": 100, "y": 100}, {"id": 2, "x": 200, "y": 150}]})
+    assert sensor.is_on
+    assert hass.states.get(sensor.entity_id).attributes["person_count"] == 2
+
+    # 停止推送位置后只保留雷达上报的状态
+    engine.reset(1)
+    assert not sensor.is_on
+    assert hass.states.get(sensor.entity_id).state == "off"
@@ -0,0 +1,39 @@
+"""Tests for writes to offline radars."""
+import asyncio
+
+from custom_components.airibes.const import DOMAIN
+from custom_components.airibes.crypto_utils import codec
+from custom_components.airibes.serializer import loads
+from custom_components.airibes.switch import RadarAPSwitch
+
+from .conftest import DEVICE_ID, upward_message
+
+
+def sent_params(published: list) -> list:
+    """解密已发送的 cmd 2011 属性帧中的 params."""
+    params = []
+    for _device_id, payload in published:
+        frame = loads(payload)
+        if frame["cmd"] == 2011 and "data" in frame:
+            params.extend(loads(codec.decrypt(frame["data"]))["params"])
+    return params
+
+
+async def test_switch_toggle_offline_is_sent_on_reconnect(hass, mqtt_client):
+    """设备离线时切换开关，指令缓存到设备上线后发送."""
+    hass.data[DOMAIN]["mqtt_client"] = mqtt_client
+    switch = RadarAPSwitch(hass, name="Radar", entity_id=f"{DOMAIN}_radar_{DEVICE_ID}_ap", device_id=DEVICE_ID)
+
+    assert not mqtt_client.is_device_online(DEVICE_ID)
+    await switch.async_turn_on()
+    assert switch.is_on
+    assert sent_params(mqtt_client.published) == []
+
+    # 设备上线（收到任意上行帧）
+    await mqtt_client._message_received(upward_message(mqtt_client, DEVICE_ID, [{"6": 1}]))
+    for _ in range(100):
+        if sent_params(mqtt_client.published):
+            break
+        await asyncio.sleep(0)
+
+    assert {"16": 1} in sent_params(mqtt_client.published)